@@ -0,0 +1,126 @@
+from utils.board import Board
+from utils.bitboard import FULL, coords, flips_mask, iter_squares, legal_moves_mask, popcount
+
+# search agents hand over to the exact solver at or below this many empty squares
+ENDGAME_EMPTIES = 10
+
+# below this many empties moves are tried in parity order only, without sorting
+SORT_EMPTIES = 6
+
+# the four 4x4 quadrants, the usual parity regions
+QUADRANTS = (0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000)
+
+def odd_regions(empty: int) -> int:
+    '''Mask of the empty squares lying in quadrants with an odd number of empties'''
+    odd = 0
+    for quadrant in QUADRANTS:
+        if popcount(empty & quadrant) & 1:
+            odd |= quadrant
+    return empty & odd
+
+def final_score(own: int, opp: int) -> int:
+    '''Disc differential of a finished game from own's side'''
+    return popcount(own) - popcount(opp)
+
+def solve(own: int, opp: int, alpha: int, beta: int) -> int:
+    '''Exact final disc differential (own - opp) with own to move, by alpha-beta.
+
+    Works on the raw bitboards only. Moves are tried fastest-first (fewest
+    replies for the opponent), with moves into odd parity regions ahead of
+    the rest.
+    '''
+    moves = legal_moves_mask(own, opp)
+    if not moves:
+        if not legal_moves_mask(opp, own):
+            return final_score(own, opp)
+        return -solve(opp, own, -beta, -alpha) # pass
+
+    empty = ~(own | opp) & FULL
+    if popcount(empty) <= SORT_EMPTIES:
+        return _solve_parity(own, opp, alpha, beta, moves, empty)
+
+    # fastest first: sort by parity region then by the opponent's mobility after the move
+    odd = odd_regions(empty)
+    ordered = []
+    for sq in iter_squares(moves):
+        flipped = flips_mask(own, opp, sq)
+        new_own = own | flipped | (1 << sq)
+        new_opp = opp ^ flipped
+        replies = popcount(legal_moves_mask(new_opp, new_own))
+        ordered.append((not odd >> sq & 1, replies, new_own, new_opp))
+    ordered.sort(key=lambda child: (child[0], child[1]))
+
+    best = -64
+    for index, (_, _, new_own, new_opp) in enumerate(ordered):
+        if index == 0:
+            score = -solve(new_opp, new_own, -beta, -alpha)
+        else:
+            # null window first, full window only if the move beats alpha
+            score = -solve(new_opp, new_own, -alpha - 1, -alpha)
+            if alpha < score < beta:
+                score = -solve(new_opp, new_own, -beta, -score)
+        if score > best:
+            best = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    return best
+
+def _solve_parity(own: int, opp: int, alpha: int, beta: int, moves: int, empty: int) -> int:
+    '''Solver body for the last few empties: odd regions first, no sorting'''
+    odd = odd_regions(empty)
+    best = -64
+    for group in (moves & odd, moves & ~odd):
+        while group:
+            low = group & -group
+            group ^= low
+            flipped = flips_mask(own, opp, low.bit_length() - 1)
+            score = -solve(opp ^ flipped, own | flipped | low, -beta, -alpha)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        return best
+    return best
+
+def empty_count(board: Board) -> int:
+    return 64 - board.black_disk_count - board.white_disk_count
+
+def solve_move(board: Board, player: int) -> tuple[tuple[int, int], int]:
+    '''Return the best move for player and the exact final disc differential it secures.
+
+    Returns ((None, None), score) when the player has to pass.
+    '''
+    own, opp = board.discs(player)
+    moves = legal_moves_mask(own, opp)
+    if not moves:
+        if not legal_moves_mask(opp, own):
+            return (None, None), final_score(own, opp)
+        return (None, None), -solve(opp, own, -64, 64)
+
+    empty = ~(own | opp) & FULL
+    odd = odd_regions(empty)
+    ordered = []
+    for sq in iter_squares(moves):
+        flipped = flips_mask(own, opp, sq)
+        new_own = own | flipped | (1 << sq)
+        new_opp = opp ^ flipped
+        ordered.append((not odd >> sq & 1, popcount(legal_moves_mask(new_opp, new_own)), sq, new_own, new_opp))
+    ordered.sort(key=lambda child: (child[0], child[1]))
+
+    best_move, best = None, -65
+    for _, _, sq, new_own, new_opp in ordered:
+        # a move only has to beat the best so far: null window first
+        score = -solve(new_opp, new_own, -best - 1, -best)
+        if score > best:
+            score = -solve(new_opp, new_own, -64, -score)
+        if score > best:
+            best_move, best = sq, score
+    return coords(best_move), best
+
+def solve_score(board: Board, player: int) -> int:
+    '''Exact final disc differential from player's side with player to move'''
+    own, opp = board.discs(player)
+    return solve(own, opp, -64, 64)
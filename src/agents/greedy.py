@@ -1,6 +1,5 @@
 from utils.board import Board
 import random
-from copy import deepcopy
 
 def greedy_move(board: Board, player: int) -> tuple[int, int]:
     '''Makes use of the board heuristic to greedily select next move'''
@@ -12,10 +11,10 @@ def greedy_move(board: Board, player: int) -> tuple[int, int]:
     legal_moves = board.all_legal_moves(player)
     if legal_moves: # if there are legal moves
         for row, col in legal_moves:
-            if board.board[row, col] == Board.EMPTY:
-                board_copy = deepcopy(board)
-                board_copy.make_move(row, col, player)
-                eval = board_copy.evaluate_board(player) # heuristic valuation
+            if board.cell(row, col) == Board.EMPTY:
+                board.apply_move(row, col, player)
+                eval = board.evaluate_board(player) # heuristic valuation
+                board.undo_move()
                 if eval >= best_eval:
                     best_move = (row, col)
                     best_eval = eval
@@ -32,10 +31,10 @@ def greedy_move_nondet(board: Board, player: int, epsilon = 0.1) -> tuple[int, i
     legal_moves = board.all_legal_moves(player)
     if legal_moves: # if there are legal moves
         for row, col in legal_moves:
-            if board.board[row, col] == Board.EMPTY:
-                board_copy = deepcopy(board)
-                board_copy.make_move(row, col, player)
-                eval = board_copy.evaluate_board(player) # heuristic valuation
+            if board.cell(row, col) == Board.EMPTY:
+                board.apply_move(row, col, player)
+                eval = board.evaluate_board(player) # heuristic valuation
+                board.undo_move()
                 if eval >= best_eval:
                     best_move = (row, col)
                     best_eval = eval
@@ -1,137 +1,714 @@
 from utils.board import Board
+from utils.bitboard import coords, flips_mask, iter_squares, legal_moves_mask
+from agents.rollout import play_random_batch, rollouts
+from agents.playout_policy import SQUARE_VALUE, random_policy
+from utils import parallel
 import numpy as np
+import os
 import random
-import copy
-
-class Node:
-    def __init__(self, board: Board, player: int, depth: int, last_move=None, parent=None, simulated = False):
-        # board is more generic state in other MCTS implementations
-        self.board = board
-        self.depth = depth
-        self.simulated = simulated
-        self.player = player
-        self.last_move = last_move
-        self.parent = parent
-        self.children = []
-        self.visit_count = 0
-        self.wins = 0.0
-
-def select(node):
-    ''' Traverse tree of next board-states, selects node with best UCB score '''
-    while node.children:
-        # return node with highest UCB score
-        node = max(node.children, key=ucb_score)
-    #selected = node.last_move
-    #if node.depth == 0:
-        #selected = 'root'
-    #print(f"Node {selected} selected, with visit count {node.visit_count}, UCT score {ucb_score(node)}")
-    return node
-
-def ucb_score(node):
-    ''' (Upper-Confidence Bound) metric for selecting next node '''
-    if node.visit_count == 0:
-        return float('inf')
-    
-    # ------- UCB
-    # average score of current node from visitation estimate
-    avg_score = node.wins / node.visit_count
-    if node.parent is not None: #avoids division by 0
-        parent_visit_count = node.parent.visit_count
-        # UCT = wins/visits + C + sqrt(log(parentvisits) / visits)
-        exploration_score = (node.wins / node.visit_count) + np.sqrt(2) * (np.sqrt(np.log(parent_visit_count) / node.visit_count))
+import time
+
+# starting node capacity of a tree; the pool doubles whenever it runs out
+INITIAL_CAPACITY = 4096
+
+# move stored for the root and for pass children
+NO_MOVE = -1
+
+# parent of a slot cut loose by pruning, until the next compaction drops it
+FREE = -2
+# share of a capped tree's node budget that one pruning pass frees
+PRUNE_FRACTION = 0.25
+# room kept free under a node cap: more than any one child block can need
+BLOCK_ROOM = 64
+# smallest node cap that leaves room for a block after pruning
+MIN_NODES = 4 * BLOCK_ROOM
+
+SQRT2 = np.sqrt(2)
+
+# visits added to a path while its playout is out with a worker, to steer other selections away
+VIRTUAL_LOSS = 1
+# leaves handed to each worker per round of leaf-parallel search
+LEAVES_PER_WORKER = 4
+# fewest leaves a worker plays as one NumPy batch rather than one at a time
+MIN_BATCH_LEAVES = 24
+
+# progressive widening: a node with n visits may open ceil(WIDEN_C * n ** WIDEN_EXP) children
+WIDEN_C = 2.0
+WIDEN_EXP = 0.5
+
+# proven game values, from the side of the player who moved into the node
+UNKNOWN, WIN, LOSS, DRAW = 0, 1, -1, 2
+
+# RAVE equivalence parameter: the AMAF weight is sqrt(RAVE_K / (3 * visits + RAVE_K))
+RAVE_K = 250
+
+class Tree:
+    '''Struct-of-arrays MCTS tree. Node i is described by index i of every array.
+
+    The children of a node sit in one contiguous block starting at
+    first_child, so a node's UCB scores are computed with one NumPy call
+    over that slice. first_child is -1 while a node is unexpanded; an
+    expanded node with no children is a finished game. Positions are stored
+    as black/white bitboards. Nodes come from a preallocated pool that
+    doubles in size when it is full.
+
+    Expansion is lazy. Expanding a node reserves a block for all num_moves
+    of its moves, ranked by static square value. Only the first
+    num_children are opened, and a child's position is computed when it is
+    opened. With widening on, a node opens children only as its visits grow.
+
+    proven marks nodes whose game value is known exactly (MCTS-Solver).
+    Finished games are proven on expansion. A node is a proven LOSS for
+    its mover once any child is a proven WIN. It is a proven WIN once every
+    move is open and a proven LOSS, and a DRAW once every move is proven
+    and the best is a draw.
+
+    With rave on, each child slot also keeps All-Moves-As-First statistics:
+    playouts in which its move was played later by the same side, opened
+    or not.
+
+    max_nodes (or max_bytes) caps the pool. Before an iteration that could
+    overflow the cap, the least visited subtrees are collapsed back into
+    leaves and the tree is compacted, so their slots are reused. evictions
+    counts the nodes freed this way, and peak_nodes the most nodes in use
+    at once.
+    '''
+
+    FIELDS = (
+        ('visits', np.float64),
+        ('wins', np.float64),       # from the side of the player who moved into the node
+        ('parent', np.int32),
+        ('first_child', np.int32),
+        ('num_children', np.int16),  # children opened so far
+        ('num_moves', np.int16),     # size of the reserved child block
+        ('move', np.int8),          # bit index of the move into the node, NO_MOVE for a pass
+        ('player', np.int8),        # side to move at the node
+        ('proven', np.int8),        # UNKNOWN, WIN, LOSS or DRAW
+        ('amaf_visits', np.float64),
+        ('amaf_wins', np.float64),
+        ('black', np.uint64),
+        ('white', np.uint64),
+    )
+
+    def __init__(self, board: Board, player: int, capacity: int = INITIAL_CAPACITY, widening: bool = False,
+                 rave: bool = False, policy=random_policy, max_nodes: int = None, max_bytes: int = None) -> None:
+        self.widening = widening
+        self.rave = rave
+        self.policy = policy # rollout policy, see agents.playout_policy
+
+        if max_bytes is not None:
+            byte_cap = max_bytes // Tree.node_bytes()
+            max_nodes = byte_cap if max_nodes is None else min(max_nodes, byte_cap)
+        if max_nodes is not None:
+            if max_nodes < MIN_NODES:
+                raise ValueError(f"MCTS tree needs a cap of at least {MIN_NODES} nodes")
+            capacity = min(capacity, max_nodes)
+        self.max_nodes = max_nodes
+        self.capacity = capacity
+        for name, dtype in Tree.FIELDS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.size = 0
+        self.peak_nodes = self.evictions = self.prunes = 0
+        self.root = self._allocate(1)
+        self._init_node(self.root, -1, NO_MOVE, player, board.black, board.white)
+
+    @staticmethod
+    def node_bytes() -> int:
+        '''Memory used by one node across all the arrays'''
+        return sum(np.dtype(dtype).itemsize for _, dtype in Tree.FIELDS)
+
+    def _allocate(self, count: int) -> int:
+        '''Reserve a contiguous block of count nodes and return its first index'''
+        if self.size + count > self.capacity:
+            capacity = 2 * self.capacity
+            if self.max_nodes is not None:
+                capacity = min(capacity, self.max_nodes)
+            self._grow(max(capacity, self.size + count))
+        start = self.size
+        self.size += count
+        self.peak_nodes = max(self.peak_nodes, self.size)
+        return start
+
+    def make_room(self) -> None:
+        '''Under a node cap, prune if the next expansion might not fit'''
+        if self.max_nodes is not None and self.size + BLOCK_ROOM > self.max_nodes:
+            self.prune()
+
+    def prune(self) -> None:
+        '''Collapse the least visited subtrees, then compact the tree.
+
+        Frees PRUNE_FRACTION of the cap on top of the block room, so pruning
+        happens once per many expansions rather than on every one.
+        '''
+        size = self.size
+        candidates = np.flatnonzero((self.num_moves[:size] > 0) & (self.parent[:size] >= 0))
+        candidates = candidates[np.argsort(self.visits[candidates], kind='stable')]
+        target = size - int((1 - PRUNE_FRACTION) * self.max_nodes) + BLOCK_ROOM
+        freed = 0
+        for node in candidates.tolist():
+            if freed >= target:
+                break
+            if self.parent[node] != FREE:
+                freed += self._collapse(node)
+        self.evictions += freed
+        self.prunes += 1
+        self.reroot(self.root)
+
+    def _collapse(self, node: int) -> int:
+        '''Cut loose every node below node, leaving it an unexpanded leaf; returns the number freed'''
+        freed = 0
+        stack = [node]
+        while stack:
+            owner = stack.pop()
+            count = int(self.num_moves[owner])
+            if count:
+                start = int(self.first_child[owner])
+                # only opened children can have blocks of their own
+                stack.extend(range(start, start + int(self.num_children[owner])))
+                self.parent[start:start + count] = FREE
+                freed += count
+        self.first_child[node] = -1
+        self.num_children[node] = self.num_moves[node] = 0
+        return freed
+
+    def _grow(self, capacity: int) -> None:
+        for name, dtype in Tree.FIELDS:
+            array = np.zeros(capacity, dtype=dtype)
+            array[:self.capacity] = getattr(self, name)
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    def _init_node(self, node: int, parent: int, move: int, player: int, black: int, white: int) -> None:
+        self.visits[node] = self.wins[node] = 0
+        self.amaf_visits[node] = self.amaf_wins[node] = 0
+        self.parent[node] = parent
+        self.first_child[node] = -1
+        self.num_children[node] = self.num_moves[node] = 0
+        self.proven[node] = UNKNOWN
+        self.move[node] = move
+        self.player[node] = player
+        self.black[node] = black
+        self.white[node] = white
+
+    def reroot(self, node: int) -> None:
+        '''Make node the root, keeping its subtree and freeing every other node.
+
+        The subtree is copied breadth first to the front of the pool, so each
+        child block, unopened slots included, stays contiguous, and the pool
+        keeps its capacity.
+        '''
+        order = [node]     # old index of each kept node, in new index order
+        first = [-1]       # new first_child of each kept node
+        for new in range(self.size):
+            if new == len(order):
+                break
+            old = order[new]
+            count = int(self.num_moves[old])
+            if count:
+                first[new] = len(order)
+                start = int(self.first_child[old])
+                order.extend(range(start, start + count))
+                first.extend([-1] * count)
+            else:
+                first[new] = int(self.first_child[old]) # unexpanded (-1) or finished (0)
+
+        order = np.array(order)
+        first = np.array(first, dtype=np.int32)
+        size = len(order)
+        for name, _ in Tree.FIELDS:
+            array = getattr(self, name)
+            array[:size] = array[order]
+
+        # parents: every node in a child block points at the block's owner
+        counts = self.num_moves[:size].astype(np.int64)
+        owners = np.flatnonzero(counts)
+        self.parent[0] = -1
+        self.parent[1:size] = np.repeat(owners, counts[owners])
+        self.first_child[:size] = first
+        self.root = 0
+        self.size = size
+
+    def find(self, black: int, white: int, player: int) -> int:
+        '''Most visited node holding this position with player to move, or -1'''
+        size = self.size
+        matches = np.flatnonzero((self.black[:size] == np.uint64(black)) & (self.white[:size] == np.uint64(white))
+                                 & (self.player[:size] == player))
+        if not matches.size:
+            return -1
+        return int(matches[np.argmax(self.visits[matches])])
+
+    def children(self, node: int) -> range:
+        start = int(self.first_child[node])
+        return range(start, start + int(self.num_children[node]))
+
+    def discs(self, node: int) -> tuple[int, int]:
+        '''Return the (own, opponent) bitboards for the side to move at node'''
+        black, white = int(self.black[node]), int(self.white[node])
+        if self.player[node] == Board.BLACK:
+            return black, white
+        return white, black
+
+    def move_coords(self, node: int) -> tuple[int, int]:
+        '''The move into node as (row, col), or (None, None) for a pass'''
+        if self.move[node] == NO_MOVE:
+            return (None, None)
+        return coords(int(self.move[node]))
+
+def widen_limit(tree: Tree, node: int) -> int:
+    ''' Number of children node may have open '''
+    if not tree.widening:
+        return tree.num_moves[node]
+    return max(1, int(np.ceil(WIDEN_C * tree.visits[node] ** WIDEN_EXP)))
+
+def select(tree: Tree) -> int:
+    ''' Traverse tree of next board-states, selects node with best UCB score
+
+    Returns the child it opens: the first child of an unexpanded node, or the
+    next untried child of a node still within its widening limit. A
+    finished game is returned as it is.
+    '''
+    node = tree.root
+    while True:
+        if tree.first_child[node] < 0:
+            return expand(tree, node)
+        opened = tree.num_children[node]
+        if opened < tree.num_moves[node] and opened < widen_limit(tree, node):
+            return open_child(tree, node)
+        if not opened:
+            return node
+        node = int(tree.first_child[node]) + int(np.argmax(ucb_scores(tree, node)))
+
+def ucb_scores(tree: Tree, node: int) -> np.ndarray:
+    ''' (Upper-Confidence Bound) metric of every child of node, in one vectorised pass '''
+    block = slice(tree.first_child[node], tree.first_child[node] + tree.num_children[node])
+    visits = tree.visits[block]
+    wins = tree.wins[block]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # average score of each child plus UCT = wins/visits + C * sqrt(log(parentvisits) / visits)
+        avg_score = wins / visits
+        if tree.rave:
+            # blend in the AMAF average, trusted less as real visits grow
+            amaf_visits = tree.amaf_visits[block]
+            amaf_score = np.where(amaf_visits > 0, tree.amaf_wins[block] / amaf_visits, avg_score)
+            beta = np.sqrt(RAVE_K / (3 * visits + RAVE_K))
+            avg_score = (1 - beta) * avg_score + beta * amaf_score
+        scores = avg_score + avg_score + SQRT2 * np.sqrt(np.log(tree.visits[node]) / visits)
+    scores[visits == 0] = np.inf
+    # solved children: a win is taken at once, a loss never, a draw is worth its fixed value
+    proven = tree.proven[block]
+    scores[proven == WIN] = np.inf
+    scores[proven == LOSS] = -np.inf
+    scores[proven == DRAW] = 1.0
+    return scores
+
+def expand(tree: Tree, node: int) -> int:
+    ''' Reserve the child block of node, open its best ranked child and return it '''
+    own, opp = tree.discs(node)
+    moves = legal_moves_mask(own, opp)
+    if moves:
+        # best static square first
+        squares = sorted(iter_squares(moves), key=SQUARE_VALUE.__getitem__, reverse=True)
+    elif legal_moves_mask(opp, own):
+        # the player has to pass: a single child with the same discs and the other side to move
+        squares = [NO_MOVE]
+    else:
+        tree.first_child[node] = 0 # game over, expanded with no children
+        diff = own.bit_count() - opp.bit_count()
+        # own belongs to the side to move, so a positive difference is a loss for the mover
+        tree.proven[node] = DRAW if diff == 0 else (LOSS if diff > 0 else WIN)
+        return node
+
+    first = tree._allocate(len(squares))
+    block = slice(first, first + len(squares))
+    tree.move[block] = squares
+    tree.parent[block] = node
+    tree.first_child[block] = -1
+    tree.num_children[block] = tree.num_moves[block] = 0
+    tree.proven[block] = UNKNOWN
+    tree.visits[block] = tree.wins[block] = 0
+    tree.amaf_visits[block] = tree.amaf_wins[block] = 0
+    # unopened slots hold no position, so find() never matches them
+    tree.black[block] = tree.white[block] = 0
+    tree.first_child[node] = first
+    tree.num_moves[node] = len(squares)
+    return open_child(tree, node)
+
+def open_child(tree: Tree, node: int) -> int:
+    ''' Open the next untried child of node: compute its position and return it '''
+    child = int(tree.first_child[node]) + int(tree.num_children[node])
+    tree.num_children[node] += 1
+    player = int(tree.player[node])
+    tree.player[child] = -player
+    sq = int(tree.move[child])
+    if sq == NO_MOVE:
+        tree.black[child], tree.white[child] = tree.black[node], tree.white[node]
+        return child
+    own, opp = tree.discs(node)
+    flipped = flips_mask(own, opp, sq)
+    new_own, new_opp = own | flipped | (1 << sq), opp & ~flipped
+    if player == Board.BLACK:
+        tree.black[child], tree.white[child] = new_own, new_opp
     else:
-        exploration_score = 0
-    
-    return avg_score + exploration_score
-
-def expand(node) -> Node:
-    ''' Return next board-state nodes for given node '''
-    possible_moves = node.board.all_legal_moves(node.player)
-    for row, col in possible_moves:
-        new_board = copy.deepcopy(node.board)  
-        new_board.make_move(row, col, node.player)
-        new_node = Node(new_board, (node.player * -1), node.depth+1,last_move=(row,col), parent=node)
-        node.children.append(new_node)
-    expanded = node.last_move
-    if expanded == None:
-        expanded = 'root'
-    #print(f"Node {expanded} with parent {node.parent} expanded to {possible_moves}")
-    return random.choice(node.children) if possible_moves else node
-
-def backpropagate(node, winner):
-    ''' Traverse back through the tree from outcome, updating score as we go '''
-    
-    while node:
-        id = node.last_move if node.parent else 'root'
-        parent = node.parent.last_move if node.parent else 'root'
-        if parent == None:
-            parent = 'root'
-        node.visit_count += 1
-        if winner == node.player*-1: #I messed up turn and player somewhere and this seems to fix it 
-            node.wins += 1
-            #print(f"BP Node {id} of player type: {node.player} node won - visits: {node.visit_count} wins: {node.wins}")
-        elif winner == 0:# node drew
-            node.wins += 0.5
-            #print(f"BP Node {id} of player type: {node.player} node lost - visits: {node.visit_count} wins: {node.wins}")
-        #else:
-            #print(f"BP Node {id} of player type: {node.player} draw - visits: {node.visit_count} wins: {node.wins}")
-        node = node.parent
+        tree.black[child], tree.white[child] = new_opp, new_own
+    return child
 
+def backpropagate(tree: Tree, node: int, winner) -> None:
+    ''' Traverse back through the tree from outcome, updating score as we go
+
+    winner is one game result or an array of results from a batch of playouts.
+    '''
+    path = []
+    while node >= 0:
+        path.append(node)
+        node = int(tree.parent[node])
+    if np.ndim(winner) == 0:
+        tree.visits[path] += 1
+        if winner == 0:
+            tree.wins[path] += 0.5
+        else:
+            # a node is won by the player who moved into it
+            tree.wins[path] += tree.player[path] == -winner
+        return
+    black_wins = np.count_nonzero(winner == Board.BLACK)
+    white_wins = np.count_nonzero(winner == Board.WHITE)
+    draws = len(winner) - black_wins - white_wins
+    tree.visits[path] += len(winner)
+    tree.wins[path] += np.where(tree.player[path] == Board.WHITE, black_wins, white_wins) + 0.5 * draws
+
+def random_playout(own: int, opp: int, player: int, policy=random_policy) -> int:
+    ''' Play policy's moves (uniformly random by default) on raw bitboards to the end, return the winner '''
+    return recorded_playout(own, opp, player, policy)[0]
+
+def recorded_playout(own: int, opp: int, player: int, policy=random_policy) -> tuple[int, int, int]:
+    ''' random_playout that also returns the squares played by black and by white '''
+    own_played = opp_played = 0
+    passed = False
+    while True:
+        moves = legal_moves_mask(own, opp)
+        if moves:
+            sq = policy(own, opp, moves)
+            flipped = flips_mask(own, opp, sq)
+            own, opp = opp & ~flipped, own | flipped | (1 << sq)
+            own_played, opp_played = opp_played, own_played | (1 << sq)
+            passed = False
+        elif passed:
+            break
+        else:
+            own, opp = opp, own
+            own_played, opp_played = opp_played, own_played
+            passed = True
+        player = -player
+    # own belongs to player at this point
+    diff = own.bit_count() - opp.bit_count()
+    winner = 0 if diff == 0 else (player if diff > 0 else -player)
+    if player == Board.BLACK:
+        return winner, own_played, opp_played
+    return winner, opp_played, own_played
 
 def play_game_random(start_player: int, board: Board) -> int:
-    board = copy.deepcopy(board)
-    player = start_player
-    while not board.is_game_over():
-        legal_moves = board.all_legal_moves(player)
-        if not legal_moves:  # If the player has no legal moves, switch to the other player
-            player *= -1
-            continue
-        row , col = random.choice(legal_moves)
-        board.make_move(row, col, player)
-        player *= -1 # Switch players after making a move
-    
-    return board.get_winner_int()
-
-def simulate(node) -> int:
-    ''' Simulate a random rollout to end of game and return the result '''
-    #original_player = node.player
-    player = node.player
-    result = play_game_random(player, node.board)
-    node.simulated = True
-    #print(f"Simulated from {node.last_move} of player type {original_player} to result {board.get_winner()}")
-    return result
-
-def monte_carlo_tree_search(root, num_iterations):
-    ''' Main MCTS steps to return best next move '''
-    for _ in range(num_iterations):
-        # start from root and select nodes until leaf reached
-        node = select(root)
-        #print(f"Node: {node} selected")
-        # expand out moves from root node & choose child random C
-        node = expand(node)
-        #print(f"Child {node} expanded")
-        # rollout phase, play one game randomly from child node C, get 1 for win -1 for loss or 0
-        winner = simulate(node)
-        #print(f"Simulation from C ends in: {score}")
-        # update scores from end to root based on simulation outcome
-        backpropagate(node, winner)
-
-    if root.children: #is not empty
-        best_child = max(root.children, key=lambda node: node.visit_count)
-        #for child in root.children:
-            #for child in child.children:
-                #print(f"Child children {child.last_move} Visit count: {node.visit_count} Wins: {node.wins}")
-            #print(f"Available choice {child.last_move} Player {child.player} Parent {child.parent.last_move} Visit count: {child.visit_count} Wins: {child.wins}")
-        #print(f"Node chosen {best_child.last_move} Player {best_child.player} UCT: {ucb_score(best_child)} Visit count: {best_child.visit_count} Wins: {best_child.wins}")
-        return best_child
+    own, opp = board.discs(start_player)
+    return random_playout(own, opp, start_player)
+
+def simulate(tree: Tree, node: int, playouts: int = 1):
+    ''' Simulate random rollouts to end of game: one winner, or an array of playouts winners '''
+    own, opp = tree.discs(node)
+    if playouts == 1:
+        return random_playout(own, opp, int(tree.player[node]), tree.policy)
+    if tree.policy is not random_policy:
+        raise ValueError("Batched playouts are uniformly random, use playouts=1 with a rollout policy")
+    return rollouts(own, opp, int(tree.player[node]), playouts)
+
+def update_amaf(tree: Tree, node: int, winner: int, black_played: int, white_played: int) -> None:
+    ''' RAVE update: credit every child slot on the path whose move its side played later on '''
+    played = {Board.BLACK: black_played, Board.WHITE: white_played}
+    child, parent = node, int(tree.parent[node])
+    while parent >= 0:
+        colour = int(tree.player[parent])
+        if tree.move[child] != NO_MOVE:
+            played[colour] |= 1 << int(tree.move[child])
+        start = int(tree.first_child[parent])
+        moves = tree.move[start:start + tree.num_moves[parent]]
+        real = moves != NO_MOVE
+        shifts = np.where(real, moves, 0).astype(np.uint64)
+        hit = real & ((np.uint64(played[colour]) >> shifts) & np.uint64(1)).astype(bool)
+        slots = start + np.flatnonzero(hit)
+        tree.amaf_visits[slots] += 1
+        tree.amaf_wins[slots] += 1 if winner == colour else (0.5 if winner == 0 else 0)
+        child, parent = parent, int(tree.parent[parent])
+
+def proven_winner(tree: Tree, node: int) -> int:
+    ''' Winner of the game at a proven node '''
+    if tree.proven[node] == DRAW:
+        return 0
+    mover = -int(tree.player[node])
+    return mover if tree.proven[node] == WIN else -mover
+
+def propagate_proof(tree: Tree, node: int) -> None:
+    ''' Carry a newly proven value from node up towards the root as far as it decides parents '''
+    while tree.proven[node] and node != tree.root:
+        parent = int(tree.parent[node])
+        if tree.proven[parent]:
+            return
+        if tree.proven[node] == WIN:
+            # the side to move at parent has a winning move
+            tree.proven[parent] = LOSS
+        else:
+            if tree.num_children[parent] < tree.num_moves[parent]:
+                return
+            children = tree.children(parent)
+            proven = tree.proven[children.start:children.stop]
+            if (proven == UNKNOWN).any():
+                return
+            tree.proven[parent] = DRAW if (proven == DRAW).any() else WIN
+        node = parent
+
+def best_child(tree: Tree) -> int:
+    ''' Most visited child of the root, or -1 if the root has none
+
+    A proven winning child is always chosen, and proven losing children only
+    when nothing else is left.
+    '''
+    if not tree.num_children[tree.root]:
+        return -1
+    children = tree.children(tree.root)
+    proven = tree.proven[children.start:children.stop]
+    if (proven == WIN).any():
+        return children.start + int(np.argmax(proven == WIN))
+    visits = np.where(proven == LOSS, -1, tree.visits[children.start:children.stop])
+    return children.start + int(np.argmax(visits))
+
+def mcts_iteration(tree: Tree, playouts: int = 1) -> None:
+    ''' One select / expand / simulate / backpropagate pass '''
+    tree.make_room()
+    # start from root and select nodes until leaf reached, opening the leaf's next child C
+    node = select(tree)
+    black_played = white_played = 0
+    if tree.proven[node]:
+        # exact result, no rollout needed
+        winner = proven_winner(tree, node)
+        if playouts > 1:
+            winner = np.full(playouts, winner)
+    elif tree.rave:
+        if playouts > 1:
+            raise ValueError("RAVE needs the moves of each playout, use playouts=1")
+        own, opp = tree.discs(node)
+        winner, black_played, white_played = recorded_playout(own, opp, int(tree.player[node]), tree.policy)
     else:
-        return (None, None)
+        # rollout phase, play games randomly from child node C
+        winner = simulate(tree, node, playouts)
+    # update scores from end to root based on simulation outcome
+    backpropagate(tree, node, winner)
+    if tree.rave:
+        update_amaf(tree, node, winner, black_played, white_played)
+    propagate_proof(tree, node)
+
+def monte_carlo_tree_search(tree: Tree, num_iterations: int, playouts: int = 1) -> int:
+    ''' Main MCTS steps, returns the best child of the root (-1 if none)
+
+    playouts > 1 runs that many rollouts per leaf as one vectorised batch.
+    Stops as soon as the root's value is proven.
+    '''
+    for _ in range(num_iterations):
+        if tree.proven[tree.root]:
+            break
+        mcts_iteration(tree, playouts)
+    return best_child(tree)
+
+def decided(tree: Tree, visits_left: float) -> bool:
+    ''' True once the most visited root child cannot be overtaken with visits_left more visits '''
+    if tree.num_moves[tree.root] < 2:
+        return True
+    # unopened children count as unvisited
+    children = tree.children(tree.root)
+    visits = np.zeros(max(2, len(children)))
+    visits[:len(children)] = tree.visits[children.start:children.stop]
+    second, best = np.partition(visits, -2)[-2:]
+    return best - second > visits_left
+
+def timed_tree_search(tree: Tree, time_ms: float, playouts: int = 1) -> dict:
+    ''' Run MCTS iterations until time_ms runs out or the root move is decided.
+
+    The remaining budget is converted to visits at the rate measured so far.
+    The search stops early once the leading root child is ahead of the
+    runner-up by more than that, or the root's value is proven. Returns
+    the search statistics.
+    '''
+    start = time.perf_counter()
+    deadline = start + time_ms / 1000
+    iterations = 0
+    stopped_early = False
+    while True:
+        if tree.proven[tree.root]:
+            stopped_early = True
+            break
+        mcts_iteration(tree, playouts)
+        iterations += 1
+        # one clock read is noise next to a rollout, so check after every iteration
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        visits_left = iterations * playouts * (deadline - now) / (now - start)
+        if decided(tree, visits_left):
+            stopped_early = True
+            break
+
+    elapsed = time.perf_counter() - start
+    return {
+        'iterations': iterations,
+        'rollouts': iterations * playouts,
+        'rollouts_per_second': iterations * playouts / elapsed,
+        'tree_size': tree.size,
+        'time_ms': elapsed * 1000,
+        'stopped_early': stopped_early,
+        'solved': bool(tree.proven[tree.root]),
+        'peak_nodes': tree.peak_nodes,
+        'evictions': tree.evictions,
+    }
+
+class MCTSAgent:
+    ''' MCTS player that keeps its tree between moves.
+
+    On each call the node for the current position, normally the grandchild
+    reached by our last move and the opponent's reply, becomes the new root
+    with its visits kept, so the search continues where it stopped.
+    '''
 
-def mcts_move(board: Board, player_color: int, iterations: int) -> tuple[int, int]:
+    def __init__(self, player: int, iterations: int = None, playouts: int = 1, time_ms: float = None,
+                 widening: bool = False, rave: bool = False, policy=random_policy, max_nodes: int = None) -> None:
+        if iterations is None and time_ms is None:
+            raise ValueError("MCTSAgent needs either iterations or time_ms")
+        self.player = player
+        self.iterations = iterations
+        self.playouts = playouts
+        self.time_ms = time_ms # search for this long instead of a fixed iteration count
+        self.widening = widening
+        self.rave = rave
+        self.policy = policy
+        self.max_nodes = max_nodes
+        self.tree = None
+        self.reused_visits = 0 # visits already at the root when the last search started
+        self.stats = None      # statistics of the last timed search
+
+    def move(self, board: Board) -> tuple[int, int]:
+        node = -1 if self.tree is None else self.tree.find(board.black, board.white, self.player)
+        if node < 0:
+            self.tree = Tree(board, self.player, widening=self.widening, rave=self.rave, policy=self.policy,
+                             max_nodes=self.max_nodes)
+        else:
+            self.tree.reroot(node)
+        self.reused_visits = int(self.tree.visits[self.tree.root])
+
+        if self.time_ms is None:
+            best = monte_carlo_tree_search(self.tree, self.iterations, self.playouts)
+        else:
+            self.stats = timed_tree_search(self.tree, self.time_ms, self.playouts)
+            best = best_child(self.tree)
+        if best < 0: #if player cannot move
+            return (None, None)
+        return self.tree.move_coords(best)
+
+def mcts_move(board: Board, player_color: int, iterations: int, playouts: int = 1, widening: bool = False,
+              rave: bool = False, policy=random_policy, max_nodes: int = None) -> tuple[int, int]:
     ''' Return best move for given player using MCTS '''
-    root = Node(board, player_color, 0)
-    move = monte_carlo_tree_search(root, iterations)
-    if move == (None, None): #if player cannot move
+    tree = Tree(board, player_color, widening=widening, rave=rave, policy=policy, max_nodes=max_nodes)
+    best = monte_carlo_tree_search(tree, iterations, playouts)
+    if best < 0: #if player cannot move
+        return (None, None)
+    return tree.move_coords(best)
+
+def mcts_move_timed(board: Board, player_color: int, time_ms: float, playouts: int = 1,
+                    widening: bool = False, rave: bool = False, policy=random_policy,
+                    max_nodes: int = None) -> tuple[tuple[int, int], dict]:
+    ''' Return the MCTS move found within time_ms and the search statistics '''
+    tree = Tree(board, player_color, widening=widening, rave=rave, policy=policy, max_nodes=max_nodes)
+    stats = timed_tree_search(tree, time_ms, playouts)
+    best = best_child(tree)
+    if best < 0: #if player cannot move
+        return (None, None), stats
+    return tree.move_coords(best), stats
+
+def root_parallel_search(board: Board, player_color: int, iterations: int, playouts: int, seed: int) -> tuple[list, list]:
+    ''' Worker task for mcts_move_root_parallel: build one independent tree, return its root (moves, visits) '''
+    # forked workers start with the same random state, so each tree gets its own seed
+    random.seed(seed)
+    tree = Tree(board, player_color)
+    monte_carlo_tree_search(tree, iterations, playouts)
+    children = tree.children(tree.root)
+    return tree.move[children.start:children.stop].tolist(), tree.visits[children.start:children.stop].tolist()
+
+def mcts_move_root_parallel(board: Board, player_color: int, iterations: int, processes: int = None,
+                            playouts: int = 1) -> tuple[int, int]:
+    ''' Root-parallel MCTS: one independent tree per worker, root visit counts summed.
+
+    Each worker runs iterations of its own, on the persistent process pool.
+    '''
+    if not board.all_legal_moves(player_color):
+        return (None, None)
+    processes = processes or os.cpu_count()
+    pool = parallel.get_pool(processes)
+    seeds = [random.getrandbits(32) for _ in range(processes)]
+    jobs = [pool.apply_async(root_parallel_search, (board, player_color, iterations, playouts, seed)) for seed in seeds]
+
+    visits = {}
+    for job in jobs:
+        for move, count in zip(*job.get()):
+            visits[move] = visits.get(move, 0) + count
+    return coords(max(visits, key=visits.get))
+
+def playout_leaves(own: np.ndarray, opp: np.ndarray, players: np.ndarray, seed: int) -> list:
+    ''' Worker task for mcts_move_leaf_parallel: one random playout from each leaf.
+
+    Chunks of at least MIN_BATCH_LEAVES leaves are played as one batch; below
+    that NumPy's per-ply overhead makes the scalar playouts faster.
+    '''
+    if len(own) >= MIN_BATCH_LEAVES:
+        return play_random_batch(own, opp, players, np.random.default_rng(seed)).tolist()
+    random.seed(seed)
+    return [random_playout(o, p, player) for o, p, player in zip(own.tolist(), opp.tolist(), players.tolist())]
+
+def apply_virtual_loss(tree: Tree, node: int, amount: int) -> None:
+    ''' Add (or with a negative amount remove) pending visits along the path from node to the root '''
+    while node >= 0:
+        tree.visits[node] += amount
+        node = int(tree.parent[node])
+
+def mcts_move_leaf_parallel(board: Board, player_color: int, iterations: int, processes: int = None,
+                            leaves_per_worker: int = LEAVES_PER_WORKER) -> tuple[int, int]:
+    ''' Leaf-parallel MCTS: one tree in this process, playouts run on the persistent pool.
+
+    Each round selects a batch of leaves. Every selected path takes a virtual
+    loss, an extra visit with no win, so the following selections spread over
+    other leaves. Their playouts run on the workers. The virtual loss is then
+    removed and the real results backpropagated.
+    '''
+    if not board.all_legal_moves(player_color):
+        return (None, None)
+    workers = processes or os.cpu_count()
+    pool = parallel.get_pool(workers)
+    tree = Tree(board, player_color)
+
+    done = 0
+    while done < iterations and not tree.proven[tree.root]:
+        leaves = []
+        for _ in range(min(workers * leaves_per_worker, iterations - done)):
+            node = select(tree)
+            apply_virtual_loss(tree, node, VIRTUAL_LOSS)
+            leaves.append(node)
+
+        # (side to move, opponent) bitboards of every leaf, dealt out to the workers in chunks
+        black, white, players = tree.black[leaves], tree.white[leaves], tree.player[leaves]
+        white_to_move = players == Board.WHITE
+        own, opp = np.where(white_to_move, white, black), np.where(white_to_move, black, white)
+        jobs = [pool.apply_async(playout_leaves, (own[i::workers], opp[i::workers], players[i::workers], random.getrandbits(32)))
+                for i in range(min(workers, len(leaves)))]
+        for i, job in enumerate(jobs):
+            for node, winner in zip(leaves[i::workers], job.get()):
+                apply_virtual_loss(tree, node, -VIRTUAL_LOSS)
+                backpropagate(tree, node, winner)
+                propagate_proof(tree, node)
+        done += len(leaves)
+
+    best = best_child(tree)
+    if best < 0: #if no child was expanded, e.g. with iterations=0
         return (None, None)
-    else: 
-        return move.last_move
+    return tree.move_coords(best)
@@ -1,64 +1,116 @@
 from utils.board import Board
-from copy import deepcopy
+from utils.transposition import TranspositionTable
+from agents.move_ordering import MoveOrderer, order_moves
+from agents.search import SearchTimeout, check_deadline, probe_result, start_search, store_result
+from agents.endgame import ENDGAME_EMPTIES, empty_count, solve_move
+from utils import parallel
+import math
+import time
 
-def minimax(board_state: Board, depth: int, alpha: int, beta: int, maximising: bool) -> int:
-    '''Implements Minimax with alpha-beta pruning to determine next move up to set depth'''
+# memory cap for the fresh table each parallel root task searches with
+PARALLEL_TT_MB = 4
+
+def shared_window(alpha: float, beta: float, bound_sign: int) -> tuple[float, float]:
+    '''Tighten (alpha, beta) by the best root score any parallel worker has found so far.
+
+    parallel.bound holds that score signed so larger is better for the root
+    player, whose sign is bound_sign. The window stops just short of it so a
+    move that ties the best still gets its exact value.
+    '''
+    best = parallel.bound.value
+    if bound_sign > 0:
+        return max(alpha, math.nextafter(best, -math.inf)), beta
+    return alpha, min(beta, math.nextafter(-best, math.inf))
+
+def minimax(board_state: Board, depth: int, alpha: int, beta: int, maximising: bool, tt: TranspositionTable = None,
+            deadline: float = None, orderer: MoveOrderer = None, ply: int = 0, bound_sign: int = 0) -> int:
+    '''Implements Minimax with alpha-beta pruning to determine next move up to set depth.
+
+    With a bound_sign (1 for a black root, -1 for white) every node re-reads
+    the shared bound of a parallel root split and narrows its window to it.
+    '''
     
+    check_deadline(deadline)
+    if bound_sign:
+        alpha, beta = shared_window(alpha, beta, bound_sign)
+
     # Check for if game over return heuristic value of node
     if depth == 0 or board_state.is_game_over() is True:
         if maximising:
             return board_state.evaluate_board(Board.BLACK)
         else:
             return board_state.evaluate_board(Board.WHITE)
+
+    # look the position up, a deep enough entry can narrow the window or answer outright
+    hash_move = -1
+    if tt is not None:
+        key = board_state.hash_for(Board.BLACK if maximising else Board.WHITE)
+        score, alpha, beta, hash_move = probe_result(tt, key, depth, alpha, beta)
+        if score is not None:
+            return score
+        alpha_orig, beta_orig = alpha, beta
+    best_move = -1
+    if orderer is not None:
+        orderer.nodes += 1
     
     # maximising player means playing as black in this case
     if maximising:
         maxEval = float('-inf')
-        legal_moves = board_state.all_legal_moves(Board.BLACK)
-        for row, col in legal_moves:
+        legal_moves = order_moves(board_state.all_legal_moves(Board.BLACK), Board.BLACK, ply, hash_move, orderer)
+        for index, (row, col) in enumerate(legal_moves):
 
-            state_copy = deepcopy(board_state) 
-            state_copy.make_move(row, col, Board.BLACK)
+            board_state.apply_move(row, col, Board.BLACK)
 
-            opponents_moves = state_copy.all_legal_moves(Board.WHITE)
+            opponents_moves = board_state.all_legal_moves(Board.WHITE)
             # recursive call with depth -1 until starting state reached
-            eval = minimax(state_copy, depth - 1, alpha, beta, not opponents_moves)
+            eval = minimax(board_state, depth - 1, alpha, beta, not opponents_moves, tt, deadline, orderer, ply + 1, bound_sign)
+            board_state.undo_move()
 
             # update best evaluation
             if eval >= maxEval:
                 maxEval = eval
+                best_move = row * 8 + col
 
             #update alpha
             if eval >= alpha:
                 alpha = eval
 
             if beta <= alpha:
+                if orderer is not None:
+                    orderer.record_cutoff((row, col), Board.BLACK, ply, depth, index)
                 break
-        #print("Maximised: ", maxEval)              
+        #print("Maximised: ", maxEval)
+        if tt is not None:
+            store_result(tt, key, depth, maxEval, alpha_orig, beta_orig, best_move)
         return maxEval
 
     # else minimizing player's turn (playing as white)
     minEval = float('+inf')
-    legal_moves = board_state.all_legal_moves(Board.WHITE)
-    for row, col in legal_moves:
+    legal_moves = order_moves(board_state.all_legal_moves(Board.WHITE), Board.WHITE, ply, hash_move, orderer)
+    for index, (row, col) in enumerate(legal_moves):
 
-        state_copy = deepcopy(board_state) 
-        state_copy.make_move(row, col, Board.WHITE)
+        board_state.apply_move(row, col, Board.WHITE)
 
-        opponents_moves = state_copy.all_legal_moves(Board.BLACK)
-        eval = minimax(state_copy, depth - 1, alpha, beta, opponents_moves)
+        opponents_moves = board_state.all_legal_moves(Board.BLACK)
+        eval = minimax(board_state, depth - 1, alpha, beta, opponents_moves, tt, deadline, orderer, ply + 1, bound_sign)
+        board_state.undo_move()
 
         # update minimum evaluation
         if eval <= minEval:
             minEval = eval
+            best_move = row * 8 + col
 
         # update beta
         if eval <= beta:
             beta = eval
 
         if beta <= alpha:
+            if orderer is not None:
+                orderer.record_cutoff((row, col), Board.WHITE, ply, depth, index)
             break
     #print("Minimised: ", minEval)
+    if tt is not None:
+        store_result(tt, key, depth, minEval, alpha_orig, beta_orig, best_move)
     return minEval
 
 def minimax_noprune(position, depth, isMaximizingPlayer):
@@ -75,11 +127,11 @@ def minimax_noprune(position, depth, isMaximizingPlayer):
         maxEval = float('-inf')
         legal_moves = position.all_legal_moves(Board.BLACK)
         for row, col in legal_moves:
-            position_deepcopy = deepcopy(position) 
-            position_deepcopy.make_move(row, col, Board.BLACK)
+            position.apply_move(row, col, Board.BLACK)
 
-            opponents_moves = position_deepcopy.all_legal_moves(Board.WHITE)
-            eval = minimax_noprune(position_deepcopy, depth - 1, opponents_moves == set())
+            opponents_moves = position.all_legal_moves(Board.WHITE)
+            eval = minimax_noprune(position, depth - 1, opponents_moves == set())
+            position.undo_move()
             maxEval = max(maxEval, eval)
 
         return maxEval
@@ -88,19 +140,31 @@ def minimax_noprune(position, depth, isMaximizingPlayer):
         minEval = float('+inf')
         legal_moves = position.all_legal_moves(Board.WHITE)
         for row, col in legal_moves:
-            if position.board[row, col] == Board.EMPTY:
-                position_deepcopy = deepcopy(position) 
-                position_deepcopy.make_move(row, col, Board.WHITE)
+            if position.cell(row, col) == Board.EMPTY:
+                position.apply_move(row, col, Board.WHITE)
 
-                opponents_moves = position_deepcopy.all_legal_moves(Board.BLACK)
-                eval = minimax_noprune(position_deepcopy, depth - 1, opponents_moves == set())
+                opponents_moves = position.all_legal_moves(Board.BLACK)
+                eval = minimax_noprune(position, depth - 1, opponents_moves == set())
+                position.undo_move()
                 minEval = min(minEval, eval)
 
         return minEval
 
-def minimax_move(board_state: Board, player: int, depth: int) -> tuple[int, int]:
-    '''Uses minimax to return a move coord tuple for player'''
+def minimax_move(board_state: Board, player: int, depth: int, tt: TranspositionTable = None, orderer: MoveOrderer = None,
+                 endgame_empties: int = ENDGAME_EMPTIES) -> tuple[int, int]:
+    '''Uses minimax to return a move coord tuple for player, solving exactly once endgame_empties or fewer squares are left'''
     #print("Playing as: ", player)
+    if empty_count(board_state) <= endgame_empties:
+        return solve_move(board_state, player)[0]
+
+    tt, orderer = start_search(tt, orderer)
+
+    bestMove, _ = minimax_root(board_state, player, depth, board_state.all_legal_moves(player), tt, orderer=orderer)
+    return bestMove
+
+def minimax_root(board_state: Board, player: int, depth: int, legal_moves: list, tt: TranspositionTable = None,
+                 deadline: float = None, orderer: MoveOrderer = None) -> tuple[tuple[int, int], float]:
+    '''Search each root move in the given order, returning the best move and its evaluation'''
     bestMove = (None,None)
     
     if player == Board.WHITE:
@@ -108,19 +172,18 @@ def minimax_move(board_state: Board, player: int, depth: int) -> tuple[int, int]
     else:
         bestEval = float('-inf')
     
-    legal_moves = board_state.all_legal_moves(player)
     for row, col in legal_moves: # due to iterating one layer deep here, depth is actually called depth+1
 
-        state_copy = deepcopy(board_state) # create a deep copy of the board position
-        state_copy.make_move(row, col, player)
+        board_state.apply_move(row, col, player) # play the move in place, undone after the search
 
         #opponents_moves = position_deepcopy.all_legal_moves(opponent)
         
         # minimax call
         if player == Board.WHITE:
-            currentEval = minimax(state_copy, depth, float('-inf'), float('inf'), True)
+            currentEval = minimax(board_state, depth, float('-inf'), float('inf'), True, tt, deadline, orderer, 1)
         else:  # player == Board.BLACK
-            currentEval = minimax(state_copy, depth, float('-inf'), float('inf'), False)
+            currentEval = minimax(board_state, depth, float('-inf'), float('inf'), False, tt, deadline, orderer, 1)
+        board_state.undo_move()
 
         if player == Board.WHITE and currentEval <= bestEval: # minimised
             bestMove = (row, col)
@@ -131,6 +194,106 @@ def minimax_move(board_state: Board, player: int, depth: int) -> tuple[int, int]
 
         #print("Best eval: ", bestEval)
 
+    return bestMove, bestEval
+
+def minimax_move_timed(board_state: Board, player: int, time_ms: float, max_depth: int = 60, tt: TranspositionTable = None,
+                       orderer: MoveOrderer = None, endgame_empties: int = ENDGAME_EMPTIES) -> tuple[tuple[int, int], int]:
+    '''Iterative deepening minimax within a time budget.
+
+    Searches depth 1, 2, 3... with the previous iteration's best move tried
+    first, until the budget in milliseconds runs out. Returns the move from
+    the deepest fully searched iteration and that depth, in minimax_move's
+    depth units. If not even depth 1 completes, the first legal move is
+    returned with depth 0. With endgame_empties or fewer squares left the
+    position is solved exactly and the number of empties is reported as the depth.
+    '''
+    deadline = time.perf_counter() + time_ms / 1000
+    empties = empty_count(board_state)
+    if empties <= endgame_empties:
+        return solve_move(board_state, player)[0], empties
+
+    tt, orderer = start_search(tt, orderer)
+
+    legal_moves = board_state.all_legal_moves(player)
+    if not legal_moves:
+        return (None,None), 0
+
+    # work on a copy: a timeout unwinds the search without undoing its moves
+    board = board_state.copy()
+
+    bestMove, reached = legal_moves[0], 0
+    for depth in range(1, max_depth + 1):
+        try:
+            move, _ = minimax_root(board, player, depth, legal_moves, tt, deadline, orderer)
+        except SearchTimeout:
+            break
+        bestMove, reached = move, depth
+
+        # previous best first for the next iteration
+        legal_moves.remove(move)
+        legal_moves.insert(0, move)
+
+        # the game ends within the searched horizon, deeper adds nothing
+        if depth + 1 >= empties:
+            break
+
+    return bestMove, reached
+
+def search_root_move(board_state: Board, player: int, depth: int, move: tuple[int, int]) -> float:
+    '''Worker task for minimax_move_parallel: evaluate one root move.
+
+    The shared bound holds the best root score found so far by any worker,
+    signed so that larger is better for player. Every node of the search
+    re-reads it, so the window keeps tightening as other workers finish. A
+    move that cannot match the best so far fails fast, while ties still get
+    their exact value.
+    '''
+    row, col = move
+    board_state.apply_move(row, col, player)
+
+    sign = 1 if player == Board.BLACK else -1
+    eval = minimax(board_state, depth, float('-inf'), float('inf'), player == Board.WHITE, TranspositionTable(PARALLEL_TT_MB),
+                   orderer=MoveOrderer(), ply=1, bound_sign=sign)
+
+    with parallel.bound.get_lock():
+        if sign * eval > parallel.bound.value:
+            parallel.bound.value = sign * eval
+    return eval
+
+def minimax_move_parallel(board_state: Board, player: int, depth: int, processes: int = None,
+                          endgame_empties: int = ENDGAME_EMPTIES) -> tuple[int, int]:
+    '''Root-split minimax over the persistent process pool.
+
+    Each root move is a separate task. Workers publish each finished root
+    score to a shared bound, and every running search polls it at each node
+    and narrows its window as it improves. Moves that were cut off can never
+    tie the best move, so applying
+    minimax_move's selection rule to the results picks the same move as the
+    serial search with a fresh table.
+    '''
+    if empty_count(board_state) <= endgame_empties:
+        return solve_move(board_state, player)[0]
+
+    legal_moves = board_state.all_legal_moves(player)
+    if not legal_moves:
+        return (None,None)
+
+    pool = parallel.get_pool(processes)
+    parallel.bound.value = float('-inf')
+    # strongest moves first so the shared bound tightens early
+    legal_moves = MoveOrderer().order(legal_moves, player, 0)
+    jobs = [pool.apply_async(search_root_move, (board_state, player, depth, move)) for move in legal_moves]
+    evals = [job.get() for job in jobs]
+
+    # same selection as minimax_root, in the original generation order
+    bestMove = (None,None)
+    bestEval = float('+inf') if player == Board.WHITE else float('-inf')
+    for move in board_state.all_legal_moves(player):
+        currentEval = evals[legal_moves.index(move)]
+        if player == Board.WHITE and currentEval <= bestEval:
+            bestMove, bestEval = move, currentEval
+        elif player == Board.BLACK and currentEval >= bestEval:
+            bestMove, bestEval = move, currentEval
     return bestMove
 
 def minimax_noprune_move(position: Board, player: int, depth: int) -> tuple[int, int]:
@@ -144,18 +307,18 @@ def minimax_noprune_move(position: Board, player: int, depth: int) -> tuple[int,
     
     legal_moves = position.all_legal_moves(player)
     for row, col in legal_moves:
-        if position.board[row, col] == Board.EMPTY:
+        if position.cell(row, col) == Board.EMPTY:
 
-            position_deepcopy = deepcopy(position) # create a deep copy of the board position
-            position_deepcopy.make_move(row, col, player)
+            position.apply_move(row, col, player) # play the move in place, undone after the search
 
             #opponents_moves = position_deepcopy.all_legal_moves(opponent)
             
             # minimax call
             if player == Board.WHITE: # minimising
-                currentEval = minimax_noprune(position_deepcopy, depth, True)
+                currentEval = minimax_noprune(position, depth, True)
             else:  # minimising
-                currentEval = minimax_noprune(position_deepcopy, depth, False)
+                currentEval = minimax_noprune(position, depth, False)
+            position.undo_move()
 
             if player == Board.WHITE and currentEval <= bestEval: # minimised
                 bestMove = (row, col)
@@ -0,0 +1,88 @@
+from utils.board import Board
+from agents.value_matrix import WIPEOUT
+import numpy as np
+
+# deepest ply killer moves are kept for
+MAX_PLY = 64
+
+def hash_move_first(legal_moves: list, hash_move: int) -> list:
+    '''Move the table's best move (a bit index) to the front of the move list'''
+    if hash_move >= 0:
+        move = divmod(hash_move, 8)
+        if move in legal_moves:
+            legal_moves.remove(move)
+            legal_moves.insert(0, move)
+    return legal_moves
+
+def order_moves(legal_moves: list, player: int, ply: int, hash_move: int, orderer=None) -> list:
+    '''Order moves with the orderer if one is given, else just put the hash move first'''
+    if orderer is None:
+        return hash_move_first(legal_moves, hash_move)
+    return orderer.order(legal_moves, player, ply, hash_move)
+
+class MoveOrderer:
+    '''Move ordering for alpha-beta search, shared by minimax and negamax.
+
+    Sort keys, strongest first: the transposition table's hash move, the two
+    killer moves of the current ply, the history score of the square for
+    that colour, and the square's static value in `matrix`.
+
+    Counters record interior nodes searched, beta cutoffs, and cutoffs
+    caused by the first move tried. cutoff_rate is the share of cutoffs
+    found on the first move, which measures ordering quality.
+    '''
+
+    def __init__(self, matrix: np.array = WIPEOUT) -> None:
+        self.static = [float(value) for value in np.asarray(matrix).flatten()]
+        self.killers = [[-1, -1] for _ in range(MAX_PLY)]
+        # history[0] for white, history[1] for black, indexed by square
+        self.history = [[0] * 64, [0] * 64]
+        self.nodes = self.cutoffs = self.first_move_cutoffs = 0
+
+    def new_search(self) -> None:
+        '''Forget killers and age the history scores before a new root search'''
+        self.killers = [[-1, -1] for _ in range(MAX_PLY)]
+        for table in self.history:
+            for sq in range(64):
+                table[sq] >>= 1
+
+    def reset_counters(self) -> None:
+        self.nodes = self.cutoffs = self.first_move_cutoffs = 0
+
+    @property
+    def cutoff_rate(self) -> float:
+        '''Fraction of beta cutoffs produced by the first move searched'''
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def order(self, legal_moves: list, player: int, ply: int, hash_move: int = -1) -> list:
+        '''Return the (row, col) moves sorted best-first'''
+        killers = self.killers[ply] if ply < MAX_PLY else (-1, -1)
+        history = self.history[player == Board.BLACK]
+        static = self.static
+
+        def key(move):
+            sq = move[0] * 8 + move[1]
+            if sq == killers[0]:
+                killer = 2
+            elif sq == killers[1]:
+                killer = 1
+            else:
+                killer = 0
+            return (sq == hash_move, killer, history[sq], static[sq])
+
+        return sorted(legal_moves, key=key, reverse=True)
+
+    def record_cutoff(self, move: tuple[int, int], player: int, ply: int, depth: int, index: int) -> None:
+        '''Update killers, history and counters after `move` caused a cutoff'''
+        sq = move[0] * 8 + move[1]
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != sq:
+                killers[1] = killers[0]
+                killers[0] = sq
+
+        self.history[player == Board.BLACK][sq] += depth * depth
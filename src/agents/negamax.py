@@ -1,50 +1,351 @@
 from utils.board import Board
-from copy import deepcopy
+from utils.transposition import SharedTranspositionTable, TranspositionTable
+from agents.search import SearchTimeout, check_deadline, probe_result, start_search, store_result
+from agents.move_ordering import MoveOrderer, order_moves
+from agents.endgame import ENDGAME_EMPTIES, empty_count, solve_move
+from utils import parallel
+import atexit
+import math
+import os
+import random
+import time
 
-def negamax(position: Board, depth: int, alpha: int, beta: int, player: int) -> int:
+# half-width of the root aspiration window, in evaluate_board units
+ASPIRATION_WINDOW = 25
+# memory cap for the shared table of the Lazy SMP search
+SMP_TT_MB = 64
+_smp_tt = None
+# tables this worker process has attached to, by shared memory name
+_attached = {}
+
+def negamax(position: Board, depth: int, alpha: int, beta: int, player: int, tt: TranspositionTable = None,
+            deadline: float = None, orderer: MoveOrderer = None, ply: int = 0) -> int:
     '''Implements Negamax with alpha-beta pruning to determine next best move'''
     
+    check_deadline(deadline)
+
     # Check for game over or no depth set
     if depth == 0 or position.is_game_over() is True:
         return position.evaluate_board(Board.WHITE)
-    
+
+    # look the position up, a deep enough entry can narrow the window or answer outright
+    hash_move = -1
+    if tt is not None:
+        key = position.hash_for(player)
+        score, alpha, beta, hash_move = probe_result(tt, key, depth, alpha, beta)
+        if score is not None:
+            return score
+        alpha_orig, beta_orig = alpha, beta
+    best_move = -1
+    if orderer is not None:
+        orderer.nodes += 1
     
     max_eval = float('-inf')
-    legal_moves = position.all_legal_moves(player)
-    for row, col in legal_moves:
-        if position.board[row, col] == Board.EMPTY:
+    legal_moves = order_moves(position.all_legal_moves(player), player, ply, hash_move, orderer)
+    for index, (row, col) in enumerate(legal_moves):
+        if position.cell(row, col) == Board.EMPTY:
 
-            position_deepcopy = deepcopy(position) 
-            position_deepcopy.make_move(row, col, player)
+            position.apply_move(row, col, player)
 
             # switch the player
             opponents_player = Board.BLACK if player == Board.WHITE else Board.WHITE
-            eval = -negamax(position_deepcopy, depth - 1, -beta, -alpha, opponents_player)
+            eval = -negamax(position, depth - 1, -beta, -alpha, opponents_player, tt, deadline, orderer, ply + 1)
+            position.undo_move()
+            if eval > max_eval:
+                best_move = row * 8 + col
             max_eval = max(max_eval, eval)
 
             alpha = max(alpha, eval)
             if alpha >= beta:
+                if orderer is not None:
+                    orderer.record_cutoff((row, col), player, ply, depth, index)
                 break
 
+    if tt is not None:
+        store_result(tt, key, depth, max_eval, alpha_orig, beta_orig, best_move)
+    return max_eval
+
+def negamax_pvs(position: Board, depth: int, alpha: float, beta: float, player: int, tt: TranspositionTable = None,
+                deadline: float = None, orderer: MoveOrderer = None, ply: int = 0) -> float:
+    '''Principal Variation Search (NegaScout) form of negamax.
+
+    The first, best ordered, child gets the full window. The rest are searched
+    with a null window just above alpha and only re-searched with the full
+    window when that scout search fails high. Returns the same value as negamax.
+    '''
+    
+    check_deadline(deadline)
+
+    # Check for game over or no depth set
+    if depth == 0 or position.is_game_over() is True:
+        return position.evaluate_board(Board.WHITE)
+
+    hash_move = -1
+    if tt is not None:
+        key = position.hash_for(player)
+        score, alpha, beta, hash_move = probe_result(tt, key, depth, alpha, beta)
+        if score is not None:
+            return score
+        alpha_orig, beta_orig = alpha, beta
+    best_move = -1
+    if orderer is not None:
+        orderer.nodes += 1
+
+    max_eval = float('-inf')
+    opponents_player = -player
+    legal_moves = order_moves(position.all_legal_moves(player), player, ply, hash_move, orderer)
+    for index, (row, col) in enumerate(legal_moves):
+
+        position.apply_move(row, col, player)
+        if index == 0:
+            eval = -negamax_pvs(position, depth - 1, -beta, -alpha, opponents_player, tt, deadline, orderer, ply + 1)
+        else:
+            # null window: only asks whether this move beats alpha
+            scout = math.nextafter(alpha, math.inf)
+            eval = -negamax_pvs(position, depth - 1, -scout, -alpha, opponents_player, tt, deadline, orderer, ply + 1)
+            if alpha < eval < beta:
+                eval = -negamax_pvs(position, depth - 1, -beta, -alpha, opponents_player, tt, deadline, orderer, ply + 1)
+        position.undo_move()
+
+        if eval > max_eval:
+            max_eval = eval
+            best_move = row * 8 + col
+
+        alpha = max(alpha, eval)
+        if alpha >= beta:
+            if orderer is not None:
+                orderer.record_cutoff((row, col), player, ply, depth, index)
+            break
+
+    if tt is not None:
+        store_result(tt, key, depth, max_eval, alpha_orig, beta_orig, best_move)
     return max_eval
 
-def negamax_move(position: Board, player: int, depth: int) -> tuple[int, int]:
-    '''Uses negamax to return a move coord tuple for player'''
+def negamax_move(position: Board, player: int, depth: int, tt: TranspositionTable = None, orderer: MoveOrderer = None,
+                 pvs: bool = False, endgame_empties: int = ENDGAME_EMPTIES) -> tuple[int, int]:
+    '''Uses negamax to return a move coord tuple for player.
+
+    With pvs=True the search deepens from depth 1 to `depth`, using PVS with an
+    aspiration window around the previous iteration's root score. Positions
+    with endgame_empties or fewer empty squares are solved exactly instead.
+    '''
     
+    if empty_count(position) <= endgame_empties:
+        return solve_move(position, player)[0]
+
+    tt, orderer = start_search(tt, orderer)
+
+    legal_moves = position.all_legal_moves(player)
+    if not pvs:
+        bestMove, _ = negamax_root(position, player, depth, legal_moves, tt, orderer=orderer)
+        return bestMove
+
+    bestMove, score = (None,None), None
+    for iteration in range(1, depth + 1):
+        move, score = negamax_aspiration(position, player, iteration, legal_moves, score, tt, orderer=orderer)
+        if move != (None,None):
+            bestMove = move
+            # previous best first for the next iteration
+            legal_moves.remove(move)
+            legal_moves.insert(0, move)
+    return bestMove
+
+def negamax_root(position: Board, player: int, depth: int, legal_moves: list, tt: TranspositionTable = None,
+                 deadline: float = None, orderer: MoveOrderer = None) -> tuple[tuple[int, int], float]:
+    '''Search each root move in the given order, returning the best move and its evaluation'''
+
     bestMove = (None,None)
     bestEval = float('-inf') if player == Board.BLACK else float('inf')
     
-    legal_moves = position.all_legal_moves(player)
     for row, col in legal_moves:
-        if position.board[row, col] == Board.EMPTY:
+        if position.cell(row, col) == Board.EMPTY:
 
-            position_deepcopy = deepcopy(position) # create a deep copy of the board position
-            position_deepcopy.make_move(row, col, player)
+            position.apply_move(row, col, player) # play the move in place, undone after the search
 
-            currentEval = -negamax(position_deepcopy, depth-1, float('-inf'), float('inf'), player*-1)
+            currentEval = -negamax(position, depth-1, float('-inf'), float('inf'), player*-1, tt, deadline, orderer, 1)
+            position.undo_move()
 
             if (player == Board.WHITE and currentEval < bestEval) or (player == Board.BLACK and currentEval > bestEval):
                 bestMove = (row, col)
                 bestEval = currentEval
 
-    return bestMove
+    return bestMove, bestEval
+
+def root_child_score(position: Board, player: int, depth: int, alpha: float, beta: float, tt: TranspositionTable = None,
+                     deadline: float = None, orderer: MoveOrderer = None) -> float:
+    '''PVS score of the move just played at the root, from the root player's side.
+
+    negamax_root keeps the largest -negamax(child) for black and the smallest
+    for white. The score here is that value with the sign turned so that
+    both colours maximise it, and (alpha, beta) is a window on it.
+    '''
+    if player == Board.BLACK:
+        return -negamax_pvs(position, depth - 1, -beta, -alpha, -player, tt, deadline, orderer, 1)
+    return negamax_pvs(position, depth - 1, alpha, beta, -player, tt, deadline, orderer, 1)
+
+def negamax_pvs_root(position: Board, player: int, depth: int, legal_moves: list, alpha: float, beta: float,
+                     tt: TranspositionTable = None, deadline: float = None, orderer: MoveOrderer = None) -> tuple[tuple[int, int], float]:
+    '''PVS over the root moves in the given order within (alpha, beta), returning the best move and its score'''
+
+    bestMove = (None,None)
+    bestScore = float('-inf')
+
+    for index, (row, col) in enumerate(legal_moves):
+        position.apply_move(row, col, player)
+        if index == 0:
+            score = root_child_score(position, player, depth, alpha, beta, tt, deadline, orderer)
+        else:
+            scout = math.nextafter(alpha, math.inf)
+            score = root_child_score(position, player, depth, alpha, scout, tt, deadline, orderer)
+            if alpha < score < beta:
+                score = root_child_score(position, player, depth, alpha, beta, tt, deadline, orderer)
+        position.undo_move()
+
+        if score > bestScore:
+            bestMove = (row, col)
+            bestScore = score
+
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+
+    return bestMove, bestScore
+
+def negamax_aspiration(position: Board, player: int, depth: int, legal_moves: list, previous_score: float = None,
+                       tt: TranspositionTable = None, deadline: float = None, orderer: MoveOrderer = None) -> tuple[tuple[int, int], float]:
+    '''Root PVS inside an aspiration window around the previous iteration's score.
+
+    A result outside the window is re-searched with the full window, so the
+    returned score is exact either way.
+    '''
+    full = (float('-inf'), float('inf'))
+    if previous_score is not None and math.isfinite(previous_score):
+        alpha, beta = previous_score - ASPIRATION_WINDOW, previous_score + ASPIRATION_WINDOW
+        move, score = negamax_pvs_root(position, player, depth, legal_moves, alpha, beta, tt, deadline, orderer)
+        if alpha < score < beta:
+            return move, score
+    return negamax_pvs_root(position, player, depth, legal_moves, *full, tt, deadline, orderer)
+
+def negamax_move_timed(position: Board, player: int, time_ms: float, max_depth: int = 60, tt: TranspositionTable = None,
+                       orderer: MoveOrderer = None, pvs: bool = False, endgame_empties: int = ENDGAME_EMPTIES) -> tuple[tuple[int, int], int]:
+    '''Iterative deepening negamax within a time budget.
+
+    Searches depth 1, 2, 3... with the previous iteration's best move tried
+    first, until the budget in milliseconds runs out. Returns the move from
+    the deepest fully searched iteration and that depth. If not even depth 1
+    completes, the first legal move is returned with depth 0. pvs=True
+    searches each iteration with PVS and an aspiration window. With
+    endgame_empties or fewer squares left the position is solved exactly and
+    the number of empties is reported as the depth.
+    '''
+    deadline = time.perf_counter() + time_ms / 1000
+    empties = empty_count(position)
+    if empties <= endgame_empties:
+        return solve_move(position, player)[0], empties
+
+    tt, orderer = start_search(tt, orderer)
+
+    legal_moves = position.all_legal_moves(player)
+    if not legal_moves:
+        return (None,None), 0
+
+    # work on a copy: a timeout unwinds the search without undoing its moves
+    board = position.copy()
+
+    bestMove, reached, score = legal_moves[0], 0, None
+    for depth in range(1, max_depth + 1):
+        try:
+            if pvs:
+                move, score = negamax_aspiration(board, player, depth, legal_moves, score, tt, deadline, orderer)
+            else:
+                move, _ = negamax_root(board, player, depth, legal_moves, tt, deadline, orderer)
+        except SearchTimeout:
+            break
+        if move == (None,None): # no root move improved on the initial bound
+            move = legal_moves[0]
+        bestMove, reached = move, depth
+
+        # previous best first for the next iteration
+        legal_moves.remove(move)
+        legal_moves.insert(0, move)
+
+        # the game ends within the searched horizon, deeper adds nothing
+        if depth >= empties:
+            break
+
+    return bestMove, reached
+
+def smp_worker(table_name: str, generation: int, position: Board, player: int, time_left: float,
+               max_depth: int, worker_id: int) -> tuple[tuple[int, int], int]:
+    '''Lazy SMP worker: iterative deepening PVS on the shared table until time runs out.
+
+    Workers differ only in where they start: odd workers search one ply deeper
+    each iteration and every helper shuffles its root moves, so they fill the
+    shared table with different parts of the tree. Returns the move and depth
+    of the deepest iteration completed.
+    '''
+    deadline = time.perf_counter() + time_left
+    if table_name not in _attached:
+        _attached[table_name] = SharedTranspositionTable(SMP_TT_MB, name=table_name)
+    tt = _attached[table_name]
+    tt.generation = generation
+    orderer = MoveOrderer()
+
+    legal_moves = position.all_legal_moves(player)
+    if worker_id:
+        random.Random(worker_id).shuffle(legal_moves)
+    empties = empty_count(position)
+
+    bestMove, reached, score = (None,None), 0, None
+    for iteration in range(1, max_depth + 1):
+        depth = iteration + (worker_id & 1)
+        try:
+            move, score = negamax_aspiration(position, player, depth, legal_moves, score, tt, deadline, orderer)
+        except SearchTimeout:
+            break
+        if move != (None,None):
+            bestMove, reached = move, depth
+            legal_moves.remove(move)
+            legal_moves.insert(0, move)
+        if depth >= empties:
+            break
+    return bestMove, reached
+
+def shared_transposition_table() -> SharedTranspositionTable:
+    '''Return the shared table the Lazy SMP search reuses across moves, creating it on first use'''
+    global _smp_tt
+    if _smp_tt is None:
+        _smp_tt = SharedTranspositionTable(SMP_TT_MB)
+        atexit.register(_smp_tt.close)
+    return _smp_tt
+
+def negamax_move_smp(position: Board, player: int, time_ms: float, workers: int = None, max_depth: int = 60,
+                     endgame_empties: int = ENDGAME_EMPTIES) -> tuple[tuple[int, int], int]:
+    '''Lazy SMP negamax: every pool worker searches the same root on one shared table.
+
+    There is no tree splitting. The workers only share the transposition
+    table, which lives in shared memory. When time_ms runs out, the move of
+    the deepest completed iteration across all workers is returned with that
+    depth, with ties going to the lowest worker.
+    '''
+    empties = empty_count(position)
+    if empties <= endgame_empties:
+        return solve_move(position, player)[0], empties
+
+    legal_moves = position.all_legal_moves(player)
+    if not legal_moves:
+        return (None,None), 0
+
+    workers = workers or os.cpu_count()
+    tt = shared_transposition_table()
+    tt.new_search()
+    pool = parallel.get_pool(workers)
+    jobs = [pool.apply_async(smp_worker, (tt.name, tt.generation, position, player, time_ms / 1000, max_depth, worker_id))
+            for worker_id in range(workers)]
+
+    bestMove, reached = legal_moves[0], 0
+    for job in jobs:
+        move, depth = job.get()
+        if depth > reached:
+            bestMove, reached = move, depth
+    return bestMove, reached
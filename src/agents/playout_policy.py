@@ -0,0 +1,59 @@
+'''Rollout policies for MCTS playouts.
+
+A policy picks the square to play from a legal move mask: policy(own, opp,
+moves) -> bit index. Policies score moves from the move mask and static
+square values only, so no board is copied or changed to choose a move.
+'''
+from utils.bitboard import CORNERS, iter_squares
+from agents.value_matrix import WIPEOUT
+import numpy as np
+import math
+import random
+
+# static value of each square, by bit index
+SQUARE_VALUE = tuple(float(value) for value in np.asarray(WIPEOUT).flatten())
+
+# chance of a uniformly random move in the epsilon-greedy policy
+EPSILON = 0.2
+# softmax temperature in square-value units
+TEMPERATURE = 40.0
+SOFTMAX_WEIGHT = tuple(math.exp(value / TEMPERATURE) for value in SQUARE_VALUE)
+
+def move_scores(moves: int, values: tuple = SQUARE_VALUE):
+    '''(square, score) for every move in the mask, read from a per-square table without touching the board'''
+    return ((sq, values[sq]) for sq in iter_squares(moves))
+
+def _score(move: tuple) -> float:
+    return move[1]
+
+def random_policy(own: int, opp: int, moves: int) -> int:
+    '''Uniformly random legal move'''
+    return random.choice(list(iter_squares(moves)))
+
+def corner_policy(own: int, opp: int, moves: int) -> int:
+    '''Take a corner whenever one is legal, otherwise a random move'''
+    corners = moves & CORNERS
+    return random_policy(own, opp, corners or moves)
+
+def epsilon_greedy_policy(own: int, opp: int, moves: int) -> int:
+    '''Highest value square, or a random move with probability EPSILON'''
+    if random.random() < EPSILON:
+        return random_policy(own, opp, moves)
+    return max(move_scores(moves), key=_score)[0]
+
+def softmax_policy(own: int, opp: int, moves: int) -> int:
+    '''Sample a move with probability proportional to exp(value / TEMPERATURE).
+
+    Uses the Gumbel-max trick in its exponential race form. Each move draws
+    E / weight with E ~ Exp(1), and the smallest draw is an exact softmax
+    sample. There is no normalisation and no log of the noise. The weights are
+    scored from SOFTMAX_WEIGHT, so no exp is taken per move.
+    '''
+    return min(move_scores(moves, SOFTMAX_WEIGHT), key=lambda move: random.expovariate(1.0) / move[1])[0]
+
+POLICIES = {
+    'random': random_policy,
+    'corner': corner_policy,
+    'epsilon_greedy': epsilon_greedy_policy,
+    'softmax': softmax_policy,
+}
@@ -0,0 +1,125 @@
+'''Batched random playouts: many independent games advanced in lockstep.
+
+Each game is a pair of uint64 bitboards (side to move, opponent) in NumPy
+arrays, so one ply of every game in the batch is a fixed number of array
+operations. Games that finish drop out of the working arrays.
+'''
+from utils.board import Board
+from utils.bitboard import FULL, LEFT_SHIFTS, RIGHT_SHIFTS
+import numpy as np
+
+_FULL = np.uint64(FULL)
+_ONE = np.uint64(1)
+# the four shifts towards higher bits and the four towards lower bits, as columns
+# so that every direction of every game is handled by one array operation
+_LEFT_SHIFT = np.array([shift for shift, _ in LEFT_SHIFTS], dtype=np.uint64)
+_LEFT_MASK = np.array([mask for _, mask in LEFT_SHIFTS], dtype=np.uint64)
+_RIGHT_SHIFT = np.array([shift for shift, _ in RIGHT_SHIFTS], dtype=np.uint64)
+_RIGHT_MASK = np.array([mask for _, mask in RIGHT_SHIFTS], dtype=np.uint64)
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+def popcount_batch(bits: np.ndarray) -> np.ndarray:
+    '''Number of set bits in each element of a uint64 array'''
+    bits = bits - ((bits >> _ONE) & _M1)
+    bits = (bits & _M2) + ((bits >> np.uint64(2)) & _M2)
+    bits = (bits + (bits >> np.uint64(4))) & _M4
+    return ((bits * _H01) >> np.uint64(56)).astype(np.int64)
+
+def legal_moves_batch(own: np.ndarray, opp: np.ndarray) -> np.ndarray:
+    '''legal_moves_mask over arrays of bitboards'''
+    own, opp = own[:, None], opp[:, None]
+    empty = ~(own | opp) & _FULL
+
+    o = opp & _LEFT_MASK
+    t = o & (own << _LEFT_SHIFT)
+    for _ in range(5):
+        t |= o & (t << _LEFT_SHIFT)
+    left = empty & _LEFT_MASK & (t << _LEFT_SHIFT)
+
+    o = opp & _RIGHT_MASK
+    t = o & (own >> _RIGHT_SHIFT)
+    for _ in range(5):
+        t |= o & (t >> _RIGHT_SHIFT)
+    right = empty & _RIGHT_MASK & (t >> _RIGHT_SHIFT)
+
+    return np.bitwise_or.reduce(left | right, axis=1)
+
+def flips_batch(own: np.ndarray, opp: np.ndarray, move: np.ndarray) -> np.ndarray:
+    '''flips_mask over arrays, with each move given as a single-bit mask'''
+    own, opp, move = own[:, None], opp[:, None], move[:, None]
+    zero = np.uint64(0)
+
+    # contiguous run of opp discs next to the move, kept if an own disc closes it
+    o = opp & _LEFT_MASK
+    run = o & (move << _LEFT_SHIFT)
+    for _ in range(5):
+        run |= o & (run << _LEFT_SHIFT)
+    left = np.where((run << _LEFT_SHIFT) & _LEFT_MASK & own, run, zero)
+
+    o = opp & _RIGHT_MASK
+    run = o & (move >> _RIGHT_SHIFT)
+    for _ in range(5):
+        run |= o & (run >> _RIGHT_SHIFT)
+    right = np.where((run >> _RIGHT_SHIFT) & _RIGHT_MASK & own, run, zero)
+
+    return np.bitwise_or.reduce(left | right, axis=1)
+
+def random_move_bits(moves: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    '''Pick one set bit uniformly at random from each (non-empty) move mask'''
+    bits = np.unpackbits(moves.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    squares = np.argmax(rng.random(bits.shape) * bits, axis=1)
+    return _ONE << squares.astype(np.uint64)
+
+def play_random_batch(own, opp, player, rng: np.random.Generator = None) -> np.ndarray:
+    '''Play every game to the end with uniformly random moves.
+
+    own/opp are the bitboards of the side to move and its opponent, player is
+    that side's colour; each may be an array or a scalar. Returns the winner
+    of each game as Board.BLACK, Board.WHITE or 0 for a draw.
+    '''
+    rng = rng or np.random.default_rng()
+    own, opp, player = np.broadcast_arrays(np.asarray(own, dtype=np.uint64), np.asarray(opp, dtype=np.uint64),
+                                           np.asarray(player, dtype=np.int8))
+    own, opp, player = own.copy(), opp.copy(), player.copy()
+    winners = np.zeros(own.shape, dtype=np.int8)
+    games = np.arange(own.size)
+    own, opp, player = own.ravel(), opp.ravel(), player.ravel()
+    passed = np.zeros(own.size, dtype=bool)
+
+    while games.size:
+        moves = legal_moves_batch(own, opp)
+        can_move = moves != 0
+
+        # games where both sides have passed in a row are over
+        over = ~can_move & passed
+        if over.any():
+            diff = popcount_batch(own[over]) - popcount_batch(opp[over])
+            winners.flat[games[over]] = np.sign(diff) * player[over]
+            keep = ~over
+            games, own, opp, player = games[keep], own[keep], opp[keep], player[keep]
+            moves, can_move = moves[keep], can_move[keep]
+
+        if can_move.any():
+            mover_own, mover_opp = own[can_move], opp[can_move]
+            bit = random_move_bits(moves[can_move], rng)
+            flipped = flips_batch(mover_own, mover_opp, bit)
+            own[can_move], opp[can_move] = mover_opp & ~flipped, mover_own | flipped | bit
+        # a game that cannot move passes: the same swap of sides without a disc placed
+        stuck = ~can_move
+        own[stuck], opp[stuck] = opp[stuck], own[stuck]
+        passed = stuck
+        player = -player
+
+    return winners
+
+def rollouts(own: int, opp: int, player: int, count: int, rng: np.random.Generator = None) -> np.ndarray:
+    '''Winners of count random playouts from one position'''
+    return play_random_batch(np.full(count, own, dtype=np.uint64), np.full(count, opp, dtype=np.uint64), player, rng)
+
+def rollouts_from_board(board: Board, player: int, count: int, rng: np.random.Generator = None) -> np.ndarray:
+    own, opp = board.discs(player)
+    return rollouts(own, opp, player, count, rng)
@@ -0,0 +1,74 @@
+'''Search infrastructure shared by the minimax and negamax engines.
+
+Deadlines, transposition table probes and stores, and the per-call set-up of
+the table and move orderer.
+'''
+from utils.transposition import TranspositionTable
+from agents.move_ordering import MoveOrderer
+import time
+
+# memory cap for the table a search call creates when the caller passes none
+TT_SIZE_MB = 16
+
+class SearchTimeout(Exception):
+    '''Raised inside a search once its deadline has passed'''
+
+def check_deadline(deadline: float) -> None:
+    '''Abort the search if the perf_counter deadline has passed'''
+    if deadline is not None and time.perf_counter() >= deadline:
+        raise SearchTimeout
+
+def usable_depth(entry_depth: int, depth: int) -> bool:
+    '''Whether a stored result may stand in for a search to `depth`.
+
+    Leaves are scored from the side to move, so the sign convention of a value
+    depends on the parity of the remaining depth: only reuse deeper results of
+    the same parity.
+    '''
+    return entry_depth >= depth and (entry_depth - depth) % 2 == 0
+
+def probe_result(tt: TranspositionTable, key: int, depth: int, alpha: float, beta: float) -> tuple:
+    '''Look a node up in the table.
+
+    Returns (score, alpha, beta, hash_move): score is not None when a deep
+    enough entry settles the node outright, otherwise alpha and beta are
+    narrowed by any stored bound.
+    '''
+    hash_move = -1
+    entry = tt.probe(key)
+    if entry is not None:
+        entry_depth, flag, score, hash_move = entry
+        if usable_depth(entry_depth, depth):
+            if flag == TranspositionTable.EXACT:
+                return score, alpha, beta, hash_move
+            elif flag == TranspositionTable.LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if beta <= alpha:
+                return score, alpha, beta, hash_move
+    return None, alpha, beta, hash_move
+
+def store_result(tt: TranspositionTable, key: int, depth: int, value: float, alpha: float, beta: float, best_move: int) -> None:
+    '''Store a node value with its bound type relative to the window it was searched with'''
+    if value <= alpha:
+        flag = TranspositionTable.UPPER
+    elif value >= beta:
+        flag = TranspositionTable.LOWER
+    else:
+        flag = TranspositionTable.EXACT
+    tt.store(key, depth, flag, value, best_move)
+
+def start_search(tt: TranspositionTable = None, orderer: MoveOrderer = None) -> tuple[TranspositionTable, MoveOrderer]:
+    '''Ready the table and move orderer for a new root search, creating any the caller did not pass.
+
+    Without a caller-owned table each call starts empty, so a fixed-depth search
+    never picks up deeper entries left by another agent's earlier searches.
+    '''
+    if tt is None:
+        tt = TranspositionTable(TT_SIZE_MB)
+    tt.new_search()
+    if orderer is None:
+        orderer = MoveOrderer()
+    orderer.new_search()
+    return tt, orderer
@@ -1,6 +1,6 @@
 from utils.board import Board
+from utils.bitboard import CORNERS, iter_squares, popcount, square, stable_discs
 import numpy as np
-import copy
 
 # matrix derived from FryLiZheng "Using Reinforcement Learning to Play Othello"
 FRYLIZHENG = np.array([
@@ -38,21 +38,35 @@ WIPEOUT = np.array([
     [100, -20,  10,   5,   5,  10, -20, 100]
 ])
 
+# matrices flattened by bit index (row * 8 + col) for per-square lookups
+EVOLVED_VALUES = tuple(EVOLVED.flatten().tolist())
+WIPEOUT_VALUES = tuple(WIPEOUT.flatten().tolist())
+
+# stable discs that settle the game: more than half the board can never be flipped
+STABLE_MAJORITY = 33
+
 def end_game_close(board: Board) -> bool:
-    '''Determine if the game is nearing an end from occupancy'''
+    '''Determine if the game is nearing an end from occupancy and stability'''
+    return end_game_close_discs(board.black, board.white)
+
+def end_game_close_discs(black: int, white: int) -> bool:
+    '''end_game_close for a position given only by its two bitboards'''
     
     # if all corners occupied
-    corners = (board.board[0, 0], board.board[0,7], board.board[7, 0], board.board[7, 7])
-    corners_occupied = 0
-    for corner in corners:
-        if corner == -1 or corner == 1:
-            corners_occupied += 1
-    corners_full = (corners_occupied == 4)
+    corners_full = (black | white) & CORNERS == CORNERS
     
     # or if most of board is occupied
     total_positions = 64
-    occupied = np.count_nonzero(board.board)
-    return occupied >= 0.8 * total_positions or corners_full
+    occupied = popcount(black | white)
+    if occupied >= 0.8 * total_positions or corners_full:
+        return True
+
+    # or if one side already holds a majority of unflippable discs; stable discs are a
+    # subset of that side's discs, so without enough discs the fixpoint cannot reach it
+    if max(popcount(black), popcount(white)) < STABLE_MAJORITY:
+        return False
+    stable = max(popcount(stable_discs(black, white)), popcount(stable_discs(white, black)))
+    return stable >= STABLE_MAJORITY
 
 def positional_score(board: Board, player: int, matrix: np.array) -> float:
     '''Calculate the positional score as for early game'''
@@ -68,6 +82,14 @@ def endgame_score(board: Board, player: int) -> int:
     opponent_count = np.sum(board.board == -player)
     return player_count - opponent_count
 
+def positional_delta(values: tuple, sq: int, flipped: int) -> float:
+    '''Change in the mover's positional_score from placing at bit sq and flipping `flipped`.
+
+    values is the matrix flattened by bit index. Each flipped disc leaves the
+    opponent's sum and joins the mover's, so it counts twice.
+    '''
+    return values[sq] + 2 * sum(values[flip_sq] for flip_sq in iter_squares(flipped))
+
 def evolutionary_matrix_move(board: Board, player: int) -> tuple[int, int]:
     '''Calculate a best move for player from evolved matrix, return (None,None) to skip'''
     
@@ -82,12 +104,10 @@ def evolutionary_matrix_move(board: Board, player: int) -> tuple[int, int]:
     if not moves:  
         return best_move
     
+    # every move starts from the same score, so the delta alone ranks them
     for move in moves:
         row, col = move
-        new_board = copy.deepcopy(board)
-        new_board.make_move(row, col, player)
-
-        score = positional_score(new_board, player, EVOLVED)
+        score = positional_delta(EVOLVED_VALUES, square(row, col), board.flips_for(row, col, player))
 
         if score > best_score:
             best_score = score
@@ -109,20 +129,26 @@ def wipeout_matrix_move(board: Board, player: int) -> tuple[int, int]:
     if not moves:  
         return best_move
     
+    # running scores of the current position, updated per move from its flips
+    own, opp = board.discs(player)
+    base_score = sum(WIPEOUT_VALUES[sq] for sq in iter_squares(own)) - sum(WIPEOUT_VALUES[sq] for sq in iter_squares(opp))
+    parity = popcount(own) - popcount(opp)
+
     for move in moves:
         row, col = move
-        new_board = copy.deepcopy(board)
-        new_board.make_move(row, col, player)
+        sq = square(row, col)
+        flipped = board.flips_for(row, col, player)
+        new_own, new_opp = own | flipped | (1 << sq), opp & ~flipped
 
         # switch to parity play
-        if end_game_close(new_board):
-            score = endgame_score(new_board, player)
+        if end_game_close_discs(new_own, new_opp):
+            score = parity + 1 + 2 * popcount(flipped)
         # else play by matrix
         else:
-            score = positional_score(new_board, player, WIPEOUT)
+            score = base_score + positional_delta(WIPEOUT_VALUES, sq, flipped)
 
         if score > best_score:
             best_score = score
             best_move = move
     
-    return best_move
\ No newline at end of file
+    return best_move
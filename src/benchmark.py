@@ -0,0 +1,196 @@
+from utils.board import Board
+from utils.transposition import TranspositionTable
+from agents.minimax import minimax_move, minimax_move_parallel
+from agents.negamax import negamax_move, negamax_move_smp, negamax_move_timed
+from agents.mcts import mcts_move, mcts_move_leaf_parallel, mcts_move_root_parallel, play_game_random, random_playout
+from agents.rollout import rollouts_from_board
+from agents.playout_policy import POLICIES
+from utils import parallel
+import random, time, os, sys
+
+# Run from src/ as: python benchmark.py <name>
+# fixed, seeded position set so runs are comparable across machines and changes
+POSITION_SEED = 2024
+NUM_POSITIONS = 12
+
+def position_set(count: int = NUM_POSITIONS, seed: int = POSITION_SEED, min_empties: int = 20) -> list:
+    '''Return (board, player) pairs taken from seeded random games, midgame only'''
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = Board()
+        player = Board.BLACK
+        target = rng.randint(10, 60 - min_empties)
+        while not board.is_game_over() and board.black_disk_count + board.white_disk_count - 4 < target:
+            moves = board.all_legal_moves(player)
+            if moves:
+                board.make_move(*rng.choice(moves), player)
+            player *= -1
+        if board.all_legal_moves(player) and 64 - board.black_disk_count - board.white_disk_count >= min_empties:
+            positions.append((board, player))
+    return positions
+
+def play_match(agent, opponent, games: int, seed: int = POSITION_SEED) -> float:
+    '''Score of agent against opponent (win 1, draw 0.5) over games alternating colours.
+
+    Agents are callables (board, player) -> (row, col).
+    '''
+    random.seed(seed)
+    score = 0.0
+    for game in range(games):
+        board = Board()
+        player = Board.BLACK
+        agent_colour = Board.BLACK if game % 2 == 0 else Board.WHITE
+        while not board.is_game_over():
+            row, col = (agent if player == agent_colour else opponent)(board, player)
+            if row is not None:
+                board.make_move(row, col, player)
+            player *= -1
+        winner = board.get_winner_int()
+        score += 1 if winner == agent_colour else 0.5 if winner == 0 else 0
+    return score
+
+def bench_parallel_minimax(depth: int = 3) -> None:
+    '''Speedup of root-split minimax per core count over serial minimax_move'''
+    positions = position_set()
+
+    start = time.perf_counter()
+    serial_moves = [minimax_move(board, player, depth, TranspositionTable(4)) for board, player in positions]
+    serial_time = time.perf_counter() - start
+    print(f"serial: {serial_time:.2f}s")
+
+    cores = 1
+    while cores <= os.cpu_count():
+        parallel.get_pool(cores) # warm the pool so fork cost is not timed
+        start = time.perf_counter()
+        moves = [minimax_move_parallel(board, player, depth, processes=cores) for board, player in positions]
+        elapsed = time.perf_counter() - start
+        same = sum(a == b for a, b in zip(moves, serial_moves))
+        print(f"{cores:>3} cores: {elapsed:.2f}s  speedup {serial_time / elapsed:.2f}x  same move {same}/{len(positions)}")
+        cores *= 2
+
+def bench_lazy_smp(time_ms: float = 1000) -> None:
+    '''Depth reached in a fixed time by Lazy SMP negamax per core count against serial negamax_move_timed.
+
+    Each move is also checked against a plain negamax_move search at the depth
+    that run reports, which it should match unless two moves tie.
+    '''
+    positions = position_set()
+    reference = {}
+
+    def check(board, player, move, depth):
+        if (board.hash, depth) not in reference:
+            reference[board.hash, depth] = negamax_move(board, player, depth, TranspositionTable(4), endgame_empties=0)
+        return move == reference[board.hash, depth]
+
+    results = [negamax_move_timed(board, player, time_ms, pvs=True) for board, player in positions]
+    serial_depth = sum(depth for _, depth in results) / len(positions)
+    same = sum(check(board, player, *result) for (board, player), result in zip(positions, results))
+    print(f"serial: mean depth {serial_depth:.2f}  matches negamax {same}/{len(positions)}")
+
+    cores = 1
+    while cores <= os.cpu_count():
+        parallel.get_pool(cores) # warm the pool so fork cost is not timed
+        results = [negamax_move_smp(board, player, time_ms, workers=cores) for board, player in positions]
+        depth = sum(depth for _, depth in results) / len(positions)
+        same = sum(check(board, player, *result) for (board, player), result in zip(positions, results))
+        print(f"{cores:>3} cores: mean depth {depth:.2f}  ({depth - serial_depth:+.2f})  matches negamax {same}/{len(positions)}")
+        cores *= 2
+
+def bench_rollouts(seconds: float = 2.0) -> None:
+    '''Random playouts per second: one game at a time vs batches of K games in lockstep'''
+    positions = position_set()
+
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        board, player = positions[count % len(positions)]
+        play_game_random(player, board)
+        count += 1
+    print(f"     single: {count / (time.perf_counter() - start):8.0f} playouts/s")
+
+    for batch in (16, 64, 256, 1024):
+        count, start = 0, time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            board, player = positions[count // batch % len(positions)]
+            rollouts_from_board(board, player, batch)
+            count += batch
+        print(f"batch {batch:>5}: {count / (time.perf_counter() - start):8.0f} playouts/s")
+
+def bench_parallel_mcts(iterations: int = 200) -> None:
+    '''Playout throughput of root-, leaf- and batched leaf-parallel MCTS per core count against serial mcts_move'''
+    positions = position_set(4)
+
+    start = time.perf_counter()
+    for board, player in positions:
+        mcts_move(board, player, iterations)
+    print(f"serial: {len(positions) * iterations / (time.perf_counter() - start):.0f} playouts/s")
+
+    cores = 1
+    while cores <= os.cpu_count():
+        parallel.get_pool(cores) # warm the pool so fork cost is not timed
+        start = time.perf_counter()
+        for board, player in positions:
+            mcts_move_root_parallel(board, player, iterations, processes=cores)
+        root_rate = len(positions) * iterations * cores / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for board, player in positions:
+            mcts_move_leaf_parallel(board, player, iterations * cores, processes=cores)
+        leaf_rate = len(positions) * iterations * cores / (time.perf_counter() - start)
+        # 64 leaves per worker round, enough for the workers to play them as one NumPy batch
+        start = time.perf_counter()
+        for board, player in positions:
+            mcts_move_leaf_parallel(board, player, iterations * cores, processes=cores, leaves_per_worker=64)
+        batch_rate = len(positions) * iterations * cores / (time.perf_counter() - start)
+        print(f"{cores:>3} cores: root {root_rate:.0f} playouts/s  leaf {leaf_rate:.0f} playouts/s  "
+              f"leaf batched {batch_rate:.0f} playouts/s")
+        cores *= 2
+
+def bench_rave(games: int = 20) -> None:
+    '''Head-to-head score of RAVE MCTS against plain mcts_move at a few iteration budgets'''
+    for rave_iterations, plain_iterations in ((100, 100), (100, 250), (250, 250)):
+        score = play_match(lambda board, player: mcts_move(board, player, rave_iterations, rave=True),
+                           lambda board, player: mcts_move(board, player, plain_iterations), games)
+        print(f"rave-{rave_iterations} vs mcts-{plain_iterations}: {score}/{games}")
+
+def bench_policies(iterations: int = 100, games: int = 20) -> None:
+    '''Playout cost and strength per CPU-second of each rollout policy.
+
+    Each policy plays MCTS with the given iterations against uniformly random
+    rollouts at the same iterations. Its win rate is divided by the CPU
+    seconds it spent per game.
+    '''
+    positions = position_set()
+    for name, policy in POLICIES.items():
+        count, start = 0, time.process_time()
+        while time.process_time() - start < 1.0:
+            board, player = positions[count % len(positions)]
+            own, opp = board.discs(player)
+            random_playout(own, opp, player, policy)
+            count += 1
+        rate = count / (time.process_time() - start)
+
+        cpu = [0.0]
+        def agent(board, player):
+            start = time.process_time()
+            move = mcts_move(board, player, iterations, policy=policy)
+            cpu[0] += time.process_time() - start
+            return move
+        score = play_match(agent, lambda board, player: mcts_move(board, player, iterations), games)
+        win_rate = score / games
+        print(f"{name:>15}: {rate:6.0f} playouts/s  win rate {win_rate:.2f}  "
+              f"{win_rate / (cpu[0] / games):.3f} win rate per CPU-second per game")
+
+BENCHMARKS = {
+    'parallel_minimax': bench_parallel_minimax,
+    'lazy_smp': bench_lazy_smp,
+    'rollouts': bench_rollouts,
+    'parallel_mcts': bench_parallel_mcts,
+    'rave': bench_rave,
+    'policies': bench_policies,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print(f"== {name}")
+        BENCHMARKS[name]()
@@ -1,5 +1,5 @@
 from utils.board import Board
-from agents.mcts import Node, monte_carlo_tree_search, mcts_move
+from agents.mcts import Tree, monte_carlo_tree_search, mcts_move
 from agents.minimax import minimax_move, minimax_noprune_move
 from agents.greedy import greedy_move, greedy_move_nondet
 from agents.negamax import negamax_move
@@ -1,9 +1,11 @@
 from utils.board import Board
+from utils.transposition import TranspositionTable
 from agents.minimax import minimax_move
+from agents.search import TT_SIZE_MB
 from agents.random import random_move
 from agents.greedy import greedy_move
 from agents.negamax import negamax_move
-from agents.mcts import mcts_move
+from agents.mcts import MCTSAgent
 from agents.value_matrix import evolutionary_matrix_move, wipeout_matrix_move
 from agents.dqn import Qagent
 
@@ -67,6 +69,11 @@ class Game:
         self.p2_set = False
         self.players_set = False
 
+        # mcts players keep their search tree between turns, one per (colour, iterations)
+        self.mcts_agents = {}
+        # each search agent keeps its own transposition table, one per (colour, agent)
+        self.search_tables = {}
+
         self.running = True
         
         self.is_game_over = False
@@ -381,6 +388,18 @@ class Game:
         Game.fade_surface(self.screen, self.replay_choiceIMG, (840, 410))
         self.is_game_over = True
 
+    def mcts_agent(self, player, iterations) -> MCTSAgent:
+        ''' Return the MCTS agent for this player, created on its first turn '''
+        if (player, iterations) not in self.mcts_agents:
+            self.mcts_agents[(player, iterations)] = MCTSAgent(player, iterations)
+        return self.mcts_agents[(player, iterations)]
+
+    def search_table(self, player, agent) -> TranspositionTable:
+        ''' Return the transposition table this search agent reuses between its turns '''
+        if (player, agent) not in self.search_tables:
+            self.search_tables[(player, agent)] = TranspositionTable(TT_SIZE_MB)
+        return self.search_tables[(player, agent)]
+
     def agent_turn(self, player, agent) -> None:
         ''' Code to run when computer player's turn '''
         
@@ -390,15 +409,15 @@ class Game:
         elif agent == "greedy":
             r, c = greedy_move(self.game_board, player)
         elif agent == "negamax [2]":
-            r, c = negamax_move(self.game_board, player, 2)
+            r, c = negamax_move(self.game_board, player, 2, self.search_table(player, agent))
         elif agent == "minimax [2]":
-            r, c = minimax_move(self.game_board, player, 2)
+            r, c = minimax_move(self.game_board, player, 2, self.search_table(player, agent))
         elif agent == "minimax [3]":
-            r, c = minimax_move(self.game_board, player, 3)
+            r, c = minimax_move(self.game_board, player, 3, self.search_table(player, agent))
         elif agent == "mcts-100":
-            r, c = mcts_move(self.game_board, player, 100)
+            r, c = self.mcts_agent(player, 100).move(self.game_board)
         elif agent == "mcts-250":
-            r, c = mcts_move(self.game_board, player, 250)
+            r, c = self.mcts_agent(player, 250).move(self.game_board)
         elif agent == "wipeout matrix":
             r, c = wipeout_matrix_move(self.game_board, player)
         elif agent == "evolutionary matrix":
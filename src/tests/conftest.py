@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the game imports its packages relative to src/, as game.py does when run from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,23 @@
+'''Seeded random positions shared by the search and bitboard tests'''
+import random
+
+from utils.board import Board
+
+def random_position(seed: int, empties: int = 0, plies: int = 60) -> tuple[Board, int]:
+    '''Play seeded random moves until `plies` moves are made or at most `empties` squares are left.
+
+    Returns the board and the player to move. Passes are played through, so the
+    position can be a finished game when the seed runs out of moves first.
+    '''
+    rng = random.Random(seed)
+    board, player = Board(), Board.BLACK
+    made = 0
+    while made < plies and 64 - board.black_disk_count - board.white_disk_count > empties and not board.is_game_over():
+        moves = sorted(board.all_legal_moves(player))
+        if moves:
+            board.make_move(*rng.choice(moves), player)
+            made += 1
+        player = -player
+    if not board.all_legal_moves(player) and not board.is_game_over():
+        player = -player
+    return board, player
@@ -0,0 +1,65 @@
+'''Parity of the bitboard Board against the original NumPy implementation.
+
+Seeded random games are replayed on both boards side by side and every
+public result is compared at every ply.
+'''
+import random
+
+import numpy as np
+import pytest
+
+from tests.numpy_board import NumpyBoard
+from utils.board import Board
+
+# each game runs the slow NumPy reference at every ply; raise for a longer soak
+GAMES = 50
+PLAYERS = (Board.BLACK, Board.WHITE)
+
+def assert_same_position(board: Board, reference: NumpyBoard) -> None:
+    np.testing.assert_array_equal(board.board, reference.board)
+    assert board.black_disk_count == reference.black_disk_count
+    assert board.white_disk_count == reference.white_disk_count
+    assert board.hash == board.full_hash()
+
+    for player in PLAYERS:
+        assert sorted(board.all_legal_moves(player)) == sorted(reference.all_legal_moves(player))
+        assert board.evaluate_board(player) == pytest.approx(reference.evaluate_board(player))
+        # per-cell moves from each of the player's discs, as the original all_legal_moves walked them
+        for row, col in zip(*np.nonzero(reference.board == player)):
+            assert board.legal_moves(int(row), int(col), player) == reference.legal_moves(row, col, player)
+
+    assert board.is_game_over() == reference.is_game_over()
+
+@pytest.mark.parametrize('seed', range(GAMES))
+def test_random_game_parity(seed):
+    rng = random.Random(seed)
+    board, reference = Board(), NumpyBoard()
+    player = Board.BLACK
+
+    while not reference.is_game_over():
+        assert_same_position(board, reference)
+        moves = sorted(reference.all_legal_moves(player))
+        if moves:
+            row, col = rng.choice(moves)
+
+            # the move must come back exactly when undone, then be replayed
+            before = (board.black, board.white, board.turn, board.hash)
+            board.make_move(row, col, player)
+            board.undo_move()
+            assert (board.black, board.white, board.turn, board.hash) == before
+            np.testing.assert_array_equal(board.board, reference.board)
+
+            board.make_move(row, col, player)
+            reference.make_move(row, col, player)
+        player = -player
+
+    assert_same_position(board, reference)
+    assert board.get_winner() == reference.get_winner()
+    assert board.get_winner_int() == reference.get_winner_int()
+
+def test_illegal_move_rejected():
+    board, reference = Board(), NumpyBoard()
+    for board_under_test in (board, reference):
+        with pytest.raises(ValueError):
+            board_under_test.make_move(0, 0, Board.BLACK)
+    assert_same_position(board, reference)
@@ -0,0 +1,43 @@
+'''The exact endgame solver against a plain minimax to the end of the game'''
+import pytest
+
+from tests.positions import random_position
+from agents.endgame import empty_count, solve_move, solve_score
+from utils.bitboard import popcount
+from utils.board import Board
+
+SEEDS = range(12)
+
+def exhaustive_score(board: Board, player: int) -> int:
+    '''Final disc differential from player's side, by searching every line to the end'''
+    moves = board.all_legal_moves(player)
+    if not moves:
+        if not board.all_legal_moves(-player):
+            own, opp = board.discs(player)
+            return popcount(own) - popcount(opp)
+        return -exhaustive_score(board, -player) # pass
+
+    best = -64
+    for row, col in moves:
+        board.make_move(row, col, player)
+        best = max(best, -exhaustive_score(board, -player))
+        board.undo_move()
+    return best
+
+@pytest.mark.parametrize('empties', range(2, 9))
+@pytest.mark.parametrize('seed', SEEDS)
+def test_solver_matches_minimax(seed, empties):
+    board, player = random_position(seed, empties)
+    assert empty_count(board) <= empties
+    expected = exhaustive_score(board, player)
+
+    assert solve_score(board, player) == expected
+
+    (row, col), score = solve_move(board, player)
+    assert score == expected
+    if row is None:
+        assert not board.all_legal_moves(player)
+    else:
+        # the move returned has to secure the score, not just the score be right
+        board.make_move(row, col, player)
+        assert -exhaustive_score(board, -player) == expected
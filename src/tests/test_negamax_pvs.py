@@ -0,0 +1,26 @@
+'''Principal variation search has to return exactly what plain negamax returns'''
+import pytest
+
+from tests.positions import random_position
+from agents.move_ordering import MoveOrderer
+from agents.negamax import negamax, negamax_pvs
+from utils.transposition import TranspositionTable
+
+SEEDS = range(8)
+PLIES = (4, 20, 40)
+
+@pytest.mark.parametrize('helpers', [False, True], ids=['bare', 'table+orderer'])
+@pytest.mark.parametrize('depth', range(1, 5))
+@pytest.mark.parametrize('plies', PLIES)
+@pytest.mark.parametrize('seed', SEEDS)
+def test_pvs_matches_negamax(seed, plies, depth, helpers):
+    board, player = random_position(seed, plies=plies)
+    if not board.all_legal_moves(player):
+        pytest.skip('finished game')
+    expected = negamax(board, depth, float('-inf'), float('inf'), player)
+
+    tt, orderer = (TranspositionTable(1), MoveOrderer()) if helpers else (None, None)
+    assert negamax_pvs(board, depth, float('-inf'), float('inf'), player, tt, orderer=orderer) == expected
+    if helpers:
+        # a second search probes the entries the first one left behind
+        assert negamax_pvs(board, depth, float('-inf'), float('inf'), player, tt, orderer=orderer) == expected
@@ -0,0 +1,42 @@
+'''The batched numpy move generator against the scalar bitboard one'''
+import random
+
+import numpy as np
+import pytest
+
+from tests.positions import random_position
+from agents.rollout import flips_batch, legal_moves_batch
+from utils.bitboard import FULL, flips_mask, iter_squares, legal_moves_mask
+
+SEEDS = range(20)
+
+def random_discs(rng: random.Random) -> tuple[int, int]:
+    '''Arbitrary disjoint own/opp bitboards, not necessarily reachable in a game'''
+    filled = rng.getrandbits(64) | rng.getrandbits(64)
+    own = filled & rng.getrandbits(64)
+    return own, filled & ~own & FULL
+
+def positions(seed: int) -> list[tuple[int, int]]:
+    rng = random.Random(seed)
+    found = [random_discs(rng) for _ in range(50)]
+    for plies in range(0, 61, 6):
+        board, player = random_position(seed * 100 + plies, plies=plies)
+        found.append(board.discs(player))
+    return found
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_legal_moves_batch(seed):
+    found = positions(seed)
+    own = np.array([own for own, _ in found], dtype=np.uint64)
+    opp = np.array([opp for _, opp in found], dtype=np.uint64)
+
+    assert [int(moves) for moves in legal_moves_batch(own, opp)] == [legal_moves_mask(own, opp) for own, opp in found]
+
+@pytest.mark.parametrize('seed', SEEDS)
+def test_flips_batch(seed):
+    moves = [(own, opp, sq) for own, opp in positions(seed) for sq in iter_squares(legal_moves_mask(own, opp))]
+    own = np.array([own for own, _, _ in moves], dtype=np.uint64)
+    opp = np.array([opp for _, opp, _ in moves], dtype=np.uint64)
+    move = np.array([1 << sq for _, _, sq in moves], dtype=np.uint64)
+
+    assert [int(flipped) for flipped in flips_batch(own, opp, move)] == [flips_mask(own, opp, sq) for own, opp, sq in moves]
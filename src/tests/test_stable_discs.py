@@ -0,0 +1,26 @@
+'''Soundness of stable_discs: a disc it reports is never flipped later in the game'''
+import random
+
+import pytest
+
+from utils.board import Board
+
+GAMES = 100
+
+@pytest.mark.parametrize('seed', range(GAMES))
+def test_stable_discs_never_flip(seed):
+    rng = random.Random(seed)
+    board, player = Board(), Board.BLACK
+    stable = {Board.BLACK: 0, Board.WHITE: 0}
+
+    while not board.is_game_over():
+        for colour in stable:
+            stable[colour] |= board.stable_discs(colour)
+        moves = sorted(board.all_legal_moves(player))
+        if moves:
+            board.make_move(*rng.choice(moves), player)
+            for colour in stable:
+                own, _ = board.discs(colour)
+                assert own & stable[colour] == stable[colour]
+        player = -player
+
@@ -0,0 +1,180 @@
+'''Bitboard primitives for the 8x8 reversi board.
+
+A position is held as two 64-bit python ints, one per colour. The cell at
+(row, col) maps to bit ``row * 8 + col``, so row 0 is the lowest byte.
+'''
+
+FULL = 0xFFFFFFFFFFFFFFFF
+
+# file masks used to stop shifted bits wrapping onto the next/previous row
+NOT_COL_0 = 0xFEFEFEFEFEFEFEFE
+NOT_COL_7 = 0x7F7F7F7F7F7F7F7F
+
+CORNERS = (1 << 0) | (1 << 7) | (1 << 56) | (1 << 63)
+# squares diagonally inside each corner
+X_SQUARES = (1 << 9) | (1 << 14) | (1 << 49) | (1 << 54)
+# edge squares next to each corner
+C_SQUARES = (1 << 1) | (1 << 8) | (1 << 6) | (1 << 15) | (1 << 48) | (1 << 57) | (1 << 55) | (1 << 62)
+# cells on the outer ring: at least one neighbour in every direction pair is off the board
+EDGE = 0xFF818181818181FF
+
+# (shift, mask) pairs, the mask is applied after shifting to drop wrapped bits
+# shifts towards higher bits: right, down, down right, down left
+LEFT_SHIFTS = ((1, NOT_COL_0), (8, FULL), (9, NOT_COL_0), (7, NOT_COL_7))
+# shifts towards lower bits: left, up, up left, up right
+RIGHT_SHIFTS = ((1, NOT_COL_7), (8, FULL), (9, NOT_COL_7), (7, NOT_COL_0))
+
+
+def square(row: int, col: int) -> int:
+    '''Return the bit index of a cell'''
+    return row * 8 + col
+
+def square_bit(row: int, col: int) -> int:
+    '''Return the single-bit mask of a cell'''
+    return 1 << (row * 8 + col)
+
+def coords(sq: int) -> tuple[int, int]:
+    '''Return the (row, col) of a bit index'''
+    return divmod(sq, 8)
+
+def popcount(bits: int) -> int:
+    '''Number of set bits (discs or moves) in a mask'''
+    return bits.bit_count()
+
+def iter_squares(bits: int):
+    '''Yield the bit index of every set bit, lowest first'''
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+def direction_shift(dx: int, dy: int) -> tuple[int, int]:
+    '''Map a (row step, col step) direction to a signed shift and wrap mask'''
+    shift = dx * 8 + dy
+    if dy == 1:
+        mask = NOT_COL_0
+    elif dy == -1:
+        mask = NOT_COL_7
+    else:
+        mask = FULL
+    return shift, mask
+
+def shift_bits(bits: int, shift: int, mask: int) -> int:
+    '''Shift a mask one step in a direction, dropping bits that leave the board'''
+    if shift > 0:
+        return (bits << shift) & mask
+    return (bits >> -shift) & mask
+
+def legal_moves_mask(own: int, opp: int) -> int:
+    '''Mask of empty cells where `own` may play, flanking a run of `opp` discs'''
+    empty = ~(own | opp) & FULL
+    moves = 0
+
+    for shift, mask in LEFT_SHIFTS:
+        o = opp & mask
+        t = o & (own << shift)
+        t |= o & (t << shift)
+        t |= o & (t << shift)
+        t |= o & (t << shift)
+        t |= o & (t << shift)
+        t |= o & (t << shift)
+        moves |= empty & mask & (t << shift)
+
+    for shift, mask in RIGHT_SHIFTS:
+        o = opp & mask
+        t = o & (own >> shift)
+        t |= o & (t >> shift)
+        t |= o & (t >> shift)
+        t |= o & (t >> shift)
+        t |= o & (t >> shift)
+        t |= o & (t >> shift)
+        moves |= empty & mask & (t >> shift)
+
+    return moves
+
+def flips_mask(own: int, opp: int, sq: int) -> int:
+    '''Mask of `opp` discs flipped when `own` plays at bit index `sq`'''
+    move = 1 << sq
+    flipped = 0
+
+    for shift, mask in LEFT_SHIFTS:
+        run = 0
+        x = (move << shift) & mask
+        while x & opp:
+            run |= x
+            x = (x << shift) & mask
+        if x & own:
+            flipped |= run
+
+    for shift, mask in RIGHT_SHIFTS:
+        run = 0
+        x = (move >> shift) & mask
+        while x & opp:
+            run |= x
+            x = (x >> shift) & mask
+        if x & own:
+            flipped |= run
+
+    return flipped
+
+def neighbours(bits: int) -> int:
+    '''Mask of every cell touching a set bit in any of the eight directions'''
+    near = 0
+    for shift, mask in LEFT_SHIFTS:
+        near |= (bits << shift) & mask
+    for shift, mask in RIGHT_SHIFTS:
+        near |= (bits >> shift) & mask
+    return near & FULL
+
+def _lines(step_row: int, step_col: int) -> tuple:
+    '''Masks of every full-board line running in one direction'''
+    lines = []
+    for row in range(8):
+        for col in range(8):
+            # start only where the previous cell of the line would be off the board
+            if 0 <= row - step_row < 8 and 0 <= col - step_col < 8:
+                continue
+            line, r, c = 0, row, col
+            while 0 <= r < 8 and 0 <= c < 8:
+                line |= 1 << (r * 8 + c)
+                r, c = r + step_row, c + step_col
+            lines.append(line)
+    return tuple(lines)
+
+# lines along each axis: rows, columns, diagonals and anti-diagonals
+ROWS, COLUMNS, DIAGONALS, ANTI_DIAGONALS = _lines(0, 1), _lines(1, 0), _lines(1, 1), _lines(1, -1)
+
+def full_lines(filled: int, lines: tuple) -> int:
+    '''Union of the lines with no empty cell left'''
+    full = 0
+    for line in lines:
+        if filled & line == line:
+            full |= line
+    return full
+
+def stable_discs(own: int, opp: int) -> int:
+    '''Mask of `own` discs that can never be flipped.
+
+    A disc is stable when, along each of the four axes, it cannot be flanked:
+    the line through it is full, it sits on the board edge for that axis, or
+    the neighbour on one side is itself a stable own disc. Starting from none,
+    the set is grown until it stops changing, which spreads stability out from
+    the corners and along edges and full lines. Every disc returned is truly
+    stable; a few interior discs protected only by a mix of colours are missed.
+    '''
+    filled = own | opp
+    horizontal = full_lines(filled, ROWS) | (FULL ^ (NOT_COL_0 & NOT_COL_7))
+    vertical = full_lines(filled, COLUMNS) | 0xFF000000000000FF
+    diagonal = full_lines(filled, DIAGONALS) | EDGE
+    anti_diagonal = full_lines(filled, ANTI_DIAGONALS) | EDGE
+
+    stable, previous = 0, -1
+    while stable != previous:
+        previous = stable
+        stable = (own
+                  & (horizontal | ((stable << 1) & NOT_COL_0) | ((stable >> 1) & NOT_COL_7))
+                  & (vertical | (stable << 8) | (stable >> 8))
+                  & (diagonal | ((stable << 9) & NOT_COL_0) | ((stable >> 9) & NOT_COL_7))
+                  & (anti_diagonal | ((stable << 7) & NOT_COL_7) | ((stable >> 7) & NOT_COL_0))
+                  & FULL)
+    return stable
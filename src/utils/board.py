@@ -1,4 +1,44 @@
 import numpy as np
+import random
+from typing import NamedTuple
+from utils.bitboard import (C_SQUARES, CORNERS, FULL, X_SQUARES, coords, direction_shift, flips_mask,
+                            iter_squares, legal_moves_mask, neighbours, popcount, shift_bits, square,
+                            square_bit, stable_discs)
+
+# Zobrist keys, one per (colour, square) plus one for white to move. Seeded so
+# a position hashes the same in every process and every run.
+_zobrist_rng = random.Random(0x0DE110)
+ZOBRIST_BLACK = tuple(_zobrist_rng.getrandbits(64) for _ in range(64))
+ZOBRIST_WHITE = tuple(_zobrist_rng.getrandbits(64) for _ in range(64))
+ZOBRIST_FLIP = tuple(b ^ w for b, w in zip(ZOBRIST_BLACK, ZOBRIST_WHITE))
+ZOBRIST_TURN = _zobrist_rng.getrandbits(64)
+
+class BaseFeatures(NamedTuple):
+    '''The cheap per-colour counts from Board.base_features(), all the leaf evaluation needs'''
+    black_discs: int
+    white_discs: int
+    black_mobility: int
+    white_mobility: int
+    black_corners: int
+    white_corners: int
+
+class Features(NamedTuple):
+    '''Per-colour position features from Board.features(): the base counts plus the costlier extras'''
+    black_discs: int
+    white_discs: int
+    black_mobility: int
+    white_mobility: int
+    black_corners: int
+    white_corners: int
+    black_x_squares: int
+    white_x_squares: int
+    black_c_squares: int
+    white_c_squares: int
+    black_frontier: int
+    white_frontier: int
+    black_stable: int
+    white_stable: int
+
 # ADAPTED FROM TERNION-1121/Othello-Reversi-Game
 class Board:
     
@@ -17,24 +57,75 @@ class Board:
                 )
 
     def __init__(self) -> None:
-        '''Initialise board as a 8x8 2D numpy array (matrix)'''
-        self.board = np.zeros((8, 8), dtype=np.int8)
+        '''Initialise board as a pair of 64-bit bitboards, one per colour'''
         self.black_disk_count = self.white_disk_count = 0
                 
         # centre squares in middle of board
-        self.board[3, 3] = self.board[4,4] = Board.WHITE
-        self.board[3, 4] = self.board[4,3] = Board.BLACK
+        self.white = square_bit(3, 3) | square_bit(4, 4)
+        self.black = square_bit(3, 4) | square_bit(4, 3)
 
         self.turn = 1
+        self._array = None
+        # legal move masks per colour, computed on first use and dropped on any change
+        self._black_moves = self._white_moves = None
+        self._history = []
+        self._hash = self.full_hash()
 
         self.update_counts()
-    
+
+    @property
+    def hash(self) -> int:
+        '''64-bit Zobrist hash of the discs and the side to move, kept current by make_move'''
+        return self._hash
+
+    def hash_for(self, player: int) -> int:
+        '''Zobrist hash of the same discs with the given player to move'''
+        if player == self.turn:
+            return self._hash
+        return self._hash ^ ZOBRIST_TURN
+
+    def full_hash(self) -> int:
+        '''Recompute the Zobrist hash from scratch'''
+        h = ZOBRIST_TURN if self.turn == Board.WHITE else 0
+        for sq in iter_squares(self.black):
+            h ^= ZOBRIST_BLACK[sq]
+        for sq in iter_squares(self.white):
+            h ^= ZOBRIST_WHITE[sq]
+        return h
+
+    @property
+    def board(self) -> np.ndarray:
+        '''8x8 int8 numpy view of the bitboards (read only, rebuilt after a change)'''
+        if self._array is None:
+            black = np.unpackbits(np.array([self.black], dtype='<u8').view(np.uint8), bitorder='little')
+            white = np.unpackbits(np.array([self.white], dtype='<u8').view(np.uint8), bitorder='little')
+            array = (black.astype(np.int8) - white.astype(np.int8)).reshape(8, 8)
+            array.flags.writeable = False
+            self._array = array
+        return self._array
+
+    def copy(self) -> 'Board':
+        '''Return an independent copy of the position, far cheaper than deepcopy'''
+        clone = Board.__new__(Board)
+        clone.__dict__.update(self.__dict__)
+        clone._history = list(self._history)
+        return clone
+
+    def discs(self, player: int) -> tuple[int, int]:
+        '''Return the (own, opponent) bitboards for the player'''
+        if player == Board.BLACK:
+            return self.black, self.white
+        return self.white, self.black
+
     def update_counts(self):
-        self.black_disk_count = np.sum(self.board == Board.BLACK)
-        self.white_disk_count = np.sum(self.board == Board.WHITE)
+        self.black_disk_count = popcount(self.black)
+        self.white_disk_count = popcount(self.white)
+        self._array = None
+        self._black_moves = self._white_moves = None
 
     def switch_turn(self):
         self.turn *= -1
+        self._hash ^= ZOBRIST_TURN
 
     def reset(self) -> None:
         self.__init__()
@@ -43,8 +134,8 @@ class Board:
         '''Returns the winner of the game'''
 
         # Count the number of pieces for each player
-        black_pieces = np.sum(self.board == Board.BLACK)
-        white_pieces = np.sum(self.board == Board.WHITE)
+        black_pieces = popcount(self.black)
+        white_pieces = popcount(self.white)
 
         # Determine the winner
         if black_pieces > white_pieces:
@@ -58,8 +149,8 @@ class Board:
         '''Returns the winner of the game'''
 
         # Count the number of pieces for each player
-        black_pieces = np.sum(self.board == Board.BLACK)
-        white_pieces = np.sum(self.board == Board.WHITE)
+        black_pieces = popcount(self.black)
+        white_pieces = popcount(self.white)
 
         # Determine the winner
         if black_pieces > white_pieces:
@@ -75,42 +166,52 @@ class Board:
 
         return 0 <= x < 8 and 0 <= y < 8
 
+    def cell(self, row: int, col: int) -> int:
+        '''Return the owner of a cell: BLACK, WHITE or EMPTY'''
+        bit = square_bit(row, col)
+        if self.black & bit:
+            return Board.BLACK
+        if self.white & bit:
+            return Board.WHITE
+        return Board.EMPTY
+
+    def legal_moves_mask(self, player: int) -> int:
+        '''Return the bitboard of all legal moves for the player, cached until the position changes'''
+        if player == Board.BLACK:
+            if self._black_moves is None:
+                self._black_moves = legal_moves_mask(self.black, self.white)
+            return self._black_moves
+        if self._white_moves is None:
+            self._white_moves = legal_moves_mask(self.white, self.black)
+        return self._white_moves
+
+    def stable_discs(self, player: int) -> int:
+        '''Bitboard of the player's discs that can never be flipped again'''
+        own, opp = self.discs(player)
+        return stable_discs(own, opp)
+
     def all_legal_moves(self, player: int) -> list:
         '''Return all legal moves for the player'''
-        
-        full_legal_moves = []
-        for r in range(8):
-            for c in range(8):
-                if self.board[r, c] == player:
-                    new_moves = self.legal_moves(r, c, player)
-                    full_legal_moves.extend(new_moves)
-
-        # remove duplicates from moves list
-        full_legal_moves = list(set(full_legal_moves))
-        #print(f"All legal moves for: {player}, :{full_legal_moves}")
-        return full_legal_moves
+        return [coords(sq) for sq in iter_squares(self.legal_moves_mask(player))]
 
     def legal_moves(self, r, c, player):
         '''Return legal moves from a particular cell and player'''
-        opponent = -player
+        own, opp = self.discs(player)
+        empty = ~(own | opp) & FULL
         valid_moves = []
-        
+
         for dx, dy in Board.DIRECTIONS:
-            x, y = r + dx, c + dy
-            
-            if self.is_valid_cell(x, y) and self.board[x, y] == opponent:
+            shift, mask = direction_shift(dx, dy)
+            x = shift_bits(square_bit(r, c), shift, mask)
+
+            if x & opp:
                 # Move in the direction while it is opponent's piece
-                x += dx
-                y += dy
-                while self.is_valid_cell(x, y) and self.board[x, y] == opponent:
-                    x += dx
-                    y += dy
-                    if not self.is_valid_cell(x, y) or self.board[x, y] != opponent:
-                        break
+                while x & opp:
+                    x = shift_bits(x, shift, mask)
                 # Place piece if the chain ends in an empty square
-                if self.is_valid_cell(x, y) and self.board[x, y] == Board.EMPTY:
-                    valid_moves.append((x, y))
-        
+                if x & empty:
+                    valid_moves.append(coords(x.bit_length() - 1))
+
         return valid_moves
 
     def print_board(self) -> None:
@@ -133,160 +234,173 @@ class Board:
 
     def flip_disks(self, start_row, start_col, player, dx, dy):
         '''Flip opponent's disks following the rules of reversi'''
-        row, col = start_row + dx, start_col + dy
-        while self.is_valid_cell(row, col) and self.board[row, col] == -player:
-            self.board[row, col] = player
-            row += dx
-            col += dy
+        own, opp = self.discs(player)
+        shift, mask = direction_shift(dx, dy)
+        run = 0
+        x = shift_bits(square_bit(start_row, start_col), shift, mask)
+        while x & opp:
+            run |= x
+            x = shift_bits(x, shift, mask)
+        self._set_discs(player, own | run, opp & ~run)
+        self._hash = self.full_hash()
 
     def make_move(self, row, col, player):
         '''Make a move for the player at specified row and column, updating the board'''
-        if (row, col) not in self.all_legal_moves(player):
+        if not self.legal_moves_mask(player) >> square(row, col) & 1:
             print(f"Move: {row, col} not allowed for player {player}")
             raise ValueError("Move is not allowed")
+        self.apply_move(row, col, player)
+
+    def flips_for(self, row, col, player) -> int:
+        '''Bitboard of the discs a move would flip, leaving the board unchanged.
+
+        popcount of the result is the flip count; 0 means the move flips nothing.
+        '''
+        own, opp = self.discs(player)
+        return flips_mask(own, opp, square(row, col))
+
+    def apply_move(self, row, col, player) -> None:
+        '''make_move without the legality check, for moves taken from the move generator.
+
+        An illegal move here leaves the board in a wrong but undoable state.
+        '''
+        own, opp = self.discs(player)
+        sq = square(row, col)
+        bit = 1 << sq
+        flipped = flips_mask(own, opp, sq)
+        # the cached move masks go on the stack too, so undo_move gets them back for free
+        self._history.append((bit, flipped, player, self.turn, self._hash, self._black_moves, self._white_moves))
+        self._set_discs(player, own | flipped | bit, opp & ~flipped)
+
+        # incremental hash: the placed disc, each flipped disc and the side to move
+        h = self._hash ^ (ZOBRIST_BLACK[sq] if player == Board.BLACK else ZOBRIST_WHITE[sq])
+        for flip_sq in iter_squares(flipped):
+            h ^= ZOBRIST_FLIP[flip_sq]
+        if self.turn == player:
+            h ^= ZOBRIST_TURN
+        self._hash = h
+        self.turn = -player
 
-        self.board[row, col] = player
-        for dx, dy in Board.DIRECTIONS:
-            if self.capture_pieces(row, col, player, dx, dy):
-                self.flip_disks(row, col, player, dx, dy)
+        self.update_counts()
+
+    def undo_move(self) -> None:
+        '''Take back the last move made with make_move, restoring the exact prior position'''
+        bit, flipped, player, turn, h, black_moves, white_moves = self._history.pop()
+        own, opp = self.discs(player)
+        self._set_discs(player, own & ~(bit | flipped), opp | flipped)
+        self.turn = turn
+        self._hash = h
 
         self.update_counts()
+        self._black_moves, self._white_moves = black_moves, white_moves
     
     def capture_pieces(self, start_row, start_col, player, dx, dy):
         '''Check if placing a piece captures opponent's pieces'''
-        row, col = start_row + dx, start_col + dy
+        own, opp = self.discs(player)
+        shift, mask = direction_shift(dx, dy)
         pieces_to_flip = []
-        while self.is_valid_cell(row, col) and self.board[row, col] == -player:
-            pieces_to_flip.append((row, col))
-            row += dx
-            col += dy
+        x = shift_bits(square_bit(start_row, start_col), shift, mask)
+        while x & opp:
+            pieces_to_flip.append(coords(x.bit_length() - 1))
+            x = shift_bits(x, shift, mask)
 
-        if self.is_valid_cell(row, col) and self.board[row, col] == player:
+        if x & own:
             return pieces_to_flip
         return []
 
+    def _set_discs(self, player: int, own: int, opp: int) -> None:
+        '''Store (own, opponent) bitboards back by colour'''
+        if player == Board.BLACK:
+            self.black, self.white = own, opp
+        else:
+            self.white, self.black = own, opp
+        self._array = None
+        self._black_moves = self._white_moves = None
+
     def is_game_over(self):
-        '''Check if the game is over by looking for available moves for both players'''
-        black_moves = len(self.all_legal_moves(Board.BLACK))
-        white_moves = len(self.all_legal_moves(Board.WHITE))
-        return black_moves == 0 and white_moves == 0
+        '''Check if the game is over: neither player has a legal move.
+
+        Stops at black's mask when black can move; both masks stay cached for later calls.
+        '''
+        return not self.legal_moves_mask(Board.BLACK) and not self.legal_moves_mask(Board.WHITE)
+
+    def base_features(self) -> BaseFeatures:
+        '''Disc, mobility and corner counts for both colours, read straight from the bitboards'''
+        return BaseFeatures(
+            self.black_disk_count, self.white_disk_count,
+            popcount(self.legal_moves_mask(Board.BLACK)), popcount(self.legal_moves_mask(Board.WHITE)),
+            popcount(self.black & CORNERS), popcount(self.white & CORNERS),
+        )
+
+    def features(self) -> Features:
+        '''base_features() extended with X/C-square occupancy, frontier and stable discs'''
+        black, white = self.black, self.white
+        frontier = neighbours(~(black | white) & FULL)
+
+        return Features(
+            *self.base_features(),
+            popcount(black & X_SQUARES), popcount(white & X_SQUARES),
+            popcount(black & C_SQUARES), popcount(white & C_SQUARES),
+            popcount(black & frontier), popcount(white & frontier),
+            popcount(self.stable_discs(Board.BLACK)), popcount(self.stable_discs(Board.WHITE)),
+        )
 
-    def evaluate_board(self, player) -> int:
-        '''Evaluate the board as per coin parity, mobility & corner value heuristics.'''
+    @staticmethod
+    def _share(own: int, opp: int) -> float:
+        '''100 * (own - opp) / (own + opp), or 0 when the two sides are level'''
+        if own == opp:
+            return 0
+        return 100 * (own - opp) / (own + opp)
 
-        # coin parity heuristic - difference in number of disks for player
-        total_on_board = self.black_disk_count + self.white_disk_count
-        
+    def _base_heuristics(self, player: int, features: BaseFeatures, corner_weight: int) -> float:
+        '''Coin parity, mobility and corner value shared by both evaluators.
+
+        Takes a BaseFeatures or a full Features, which starts with the same fields.
+        '''
         if player == Board.BLACK:
-            coin_dif = self.black_disk_count - self.white_disk_count
-            coin_parity = 100 * (coin_dif) / (total_on_board)
-        else:
-            coin_dif = self.white_disk_count - self.black_disk_count
-            coin_parity = 100 * (coin_dif) / (total_on_board)
-        
-        # mobility heuristic - number of empty spaces a player could move into
-        black_mobility = len(self.all_legal_moves(Board.BLACK))
-        white_mobility = len(self.all_legal_moves(Board.WHITE))
-        total_mobility = black_mobility + white_mobility
-        if black_mobility == white_mobility:
-            actual_mobility = 0
+            discs, opp_discs = features.black_discs, features.white_discs
+            mobility, opp_mobility = features.black_mobility, features.white_mobility
+            corners, opp_corners = features.black_corners, features.white_corners
         else:
-            # evaluate for given player
-            if player == Board.BLACK:
-                mob_dif = black_mobility - white_mobility
-                actual_mobility = 100 * (mob_dif) / (total_mobility)
-            else:
-                mob_dif = white_mobility - black_mobility
-                actual_mobility = 100 * (mob_dif) / (total_mobility)
-        
-        # corner heuristic - corners cannot be flipped once set
-        corners = (self.board[0, 0], self.board[0,7], self.board[7, 0], self.board[7, 7])
+            discs, opp_discs = features.white_discs, features.black_discs
+            mobility, opp_mobility = features.white_mobility, features.black_mobility
+            corners, opp_corners = features.white_corners, features.black_corners
+
+        # coin parity heuristic - difference in number of disks for player
+        coin_parity = 100 * (discs - opp_discs) / (discs + opp_discs)
 
-        player_corners = sum(+25 for coin in corners if coin == player)
-        opponent_corners = sum(-25 for coin in corners if coin == player*-1)
+        # mobility heuristic - number of empty spaces a player could move into
+        actual_mobility = Board._share(mobility, opp_mobility)
 
+        # corner heuristic - corners cannot be flipped once set
+        # (opponent corners carry a negative weight, as they always have in this formula)
+        player_corners = corner_weight * corners
+        opponent_corners = -corner_weight * opp_corners
         corner_dif = player_corners - opponent_corners
         corner_total = player_corners + opponent_corners
-
-        if player_corners + opponent_corners == 0: corner_value = 0
+        if corner_total == 0: corner_value = 0
         else: corner_value = 100 * (corner_dif) / (corner_total)
 
         return coin_parity + actual_mobility + corner_value
-    
-    def evaluate_nn(self, player) -> int:
-        '''Evaluate the board as per coin parity, mobility & corner value heuristics.'''
 
-        # coin parity heuristic - difference in number of disks for player
-        total_on_board = self.black_disk_count + self.white_disk_count
-        
-        if player == Board.BLACK:
-            coin_dif = self.black_disk_count - self.white_disk_count
-            coin_parity = 100 * (coin_dif) / (total_on_board)
-        else:
-            coin_dif = self.white_disk_count - self.black_disk_count
-            coin_parity = 100 * (coin_dif) / (total_on_board)
-        
-        # mobility heuristic - number of empty spaces a player could move into
-        black_mobility = len(self.all_legal_moves(Board.BLACK))
-        white_mobility = len(self.all_legal_moves(Board.WHITE))
-        total_mobility = black_mobility + white_mobility
-        if black_mobility == white_mobility:
-            actual_mobility = 0
-        else:
-            # evaluate for given player
-            if player == Board.BLACK:
-                mob_dif = black_mobility - white_mobility
-                actual_mobility = 100 * (mob_dif) / (total_mobility)
-            else:
-                mob_dif = white_mobility - black_mobility
-                actual_mobility = 100 * (mob_dif) / (total_mobility)
-        
-        # corner heuristic - corners cannot be flipped once set
-        corners = (self.board[0, 0], self.board[0,7], self.board[7, 0], self.board[7, 7])
-
-        player_corners = sum(+20 for coin in corners if coin == player)
-        opponent_corners = sum(-20 for coin in corners if coin == player*-1)
-
-        corner_dif = player_corners - opponent_corners
-        corner_total = player_corners + opponent_corners
+    def evaluate_board(self, player) -> int:
+        '''Evaluate the board as per coin parity, mobility & corner value heuristics.'''
+        # the search leaf evaluation: base counts only, no stability fixpoint
+        return self._base_heuristics(player, self.base_features(), 25)
 
-        if player_corners + opponent_corners == 0: corner_value = 0
-        else: corner_value = 100 * (corner_dif) / (corner_total)
+    def evaluate_nn(self, player) -> int:
+        '''Evaluate the board as per coin parity, mobility, corner value & stability heuristics.'''
+        features = self.features()
 
         # stability heuristic - possessing unflippable pieces on edges and corners conveys an advantage
-        stable_pieces = 0
-        stable_pieces_opp = 0
-
-        for x, y in corners:
-            # Determine the owner of the corner
-            corner_owner = self.board[x][y]
-            
-            # Define adjacent positions based on the corner
-            if x == 0 and y == 0:  # Top-Left
-                adjacent = [(0, 1), (1, 0), (1, 1)]
-            elif x == 0 and y == 7:  # Top-Right
-                adjacent = [(0, 6), (1, 6), (1, 7)]
-            elif x == 7 and y == 0:  # Bottom-Left
-                adjacent = [(6, 0), (6, 1), (7, 1)]
-            elif x == 7 and y == 7:  # Bottom-Right
-                adjacent = [(6, 7), (7, 6), (6, 6)]
-
-            # Check stability based on the corner owner
-            for adj_x, adj_y in adjacent:
-                if corner_owner == player:
-                    if self.board[adj_x][adj_y] == player:
-                        stable_pieces += 1
-                elif corner_owner == player * -1:
-                    if self.board[adj_x][adj_y] == player * -1:
-                        stable_pieces_opp += 1
-
-        # Calculate the stability value
-        stable_total = stable_pieces + stable_pieces_opp
-        if stable_total == 0:
-            stability_value = 0
+        if player == Board.BLACK:
+            stability_value = Board._share(features.black_stable, features.white_stable)
         else:
-            stability_value = (stable_pieces - stable_pieces_opp) / stable_total * 100
+            stability_value = Board._share(features.white_stable, features.black_stable)
 
         # return the evaluation score
-        return coin_parity + actual_mobility + corner_value + stability_value
-    
\ No newline at end of file
+        return self._base_heuristics(player, features, 20) + stability_value
+
+def features_batch(boards) -> np.ndarray:
+    '''Features of many boards as an (N, len(Features._fields)) float32 array, one row per board'''
+    return np.array([board.features() for board in boards], dtype=np.float32).reshape(-1, len(Features._fields))
@@ -0,0 +1,40 @@
+from multiprocessing import Pool, Value, resource_tracker
+import atexit
+import os
+
+# persistent worker pool shared by the parallel searches, so no search pays the fork cost
+_pool = None
+_processes = 0
+
+# best root score found so far, shared between the workers of a root-split search
+bound = None
+
+def _init_worker(shared_bound) -> None:
+    global bound
+    bound = shared_bound
+
+def get_pool(processes: int = None) -> Pool:
+    '''Return the persistent process pool, (re)creating it for a new process count'''
+    global _pool, _processes, bound
+    processes = processes or os.cpu_count()
+    if _pool is None or _processes != processes:
+        close_pool()
+        bound = Value('d', float('-inf'))
+        # start the resource tracker before the workers exist so they share it; a worker
+        # forked without one starts its own, which then reports shared memory it attached
+        # to (a SharedTranspositionTable) as leaked and fails to unlink it at exit
+        resource_tracker.ensure_running()
+        _pool = Pool(processes, initializer=_init_worker, initargs=(bound,))
+        _processes = processes
+    return _pool
+
+def close_pool() -> None:
+    '''Shut the pool down; the next get_pool() call starts a fresh one'''
+    global _pool, _processes
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+        _pool = None
+        _processes = 0
+
+atexit.register(close_pool)
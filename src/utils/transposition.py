@@ -0,0 +1,150 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# default memory cap for a table, in megabytes
+DEFAULT_SIZE_MB = 16
+
+# three 64-bit words per entry: check word, score, packed info
+ENTRY_WORDS = 3
+ENTRY_BYTES = ENTRY_WORDS * 8
+SLOTS = 2
+
+REPLACEMENT_SCHEMES = ('depth+always', 'depth', 'always')
+
+class TranspositionTable:
+    '''Fixed-size hash table of search results keyed by Zobrist hash.
+
+    Buckets hold two slots. Under 'depth+always' the first slot keeps the
+    deepest result and the second takes whatever is stored last. 'depth'
+    replaces the shallower slot, 'always' overwrites one slot picked by the key.
+    Entries from an older search generation count as empty.
+
+    Each entry stores (check, score, info). The check word is
+    key ^ score ^ info, so a torn or colliding entry fails verification
+    instead of returning bad data.
+    '''
+
+    EXACT = 1
+    LOWER = 2
+    UPPER = 3
+
+    def __init__(self, size_mb: float = DEFAULT_SIZE_MB, replacement: str = 'depth+always', buffer=None) -> None:
+        if replacement not in REPLACEMENT_SCHEMES:
+            raise ValueError(f"Unknown replacement scheme: {replacement}")
+        self.replacement = replacement
+        self.size_mb = size_mb
+
+        # largest power of two bucket count that fits in the memory cap
+        max_buckets = int(size_mb * 2**20) // (ENTRY_BYTES * SLOTS)
+        if max_buckets < 1:
+            raise ValueError("Transposition table needs room for at least one bucket")
+        self.num_buckets = 1 << (max_buckets.bit_length() - 1)
+        self._mask = self.num_buckets - 1
+
+        shape = (self.num_buckets, SLOTS, ENTRY_WORDS)
+        if buffer is None:
+            self._words = np.zeros(shape, dtype=np.uint64)
+        else:
+            self._words = np.ndarray(shape, dtype=np.uint64, buffer=buffer)
+        # float view over the same memory for the score word
+        self._scores = self._words.view(np.float64)
+
+        self.generation = 0
+        self.probes = self.hits = self.stores = 0
+
+    @staticmethod
+    def bytes_needed(size_mb: float) -> int:
+        '''Exact buffer size a table created with size_mb will use'''
+        max_buckets = int(size_mb * 2**20) // (ENTRY_BYTES * SLOTS)
+        return (1 << (max_buckets.bit_length() - 1)) * SLOTS * ENTRY_BYTES
+
+    def new_search(self) -> None:
+        '''Age the table so entries from earlier searches become replaceable'''
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self) -> None:
+        self._words[...] = 0
+        self.probes = self.hits = self.stores = 0
+
+    @staticmethod
+    def _pack(depth: int, flag: int, move: int, generation: int) -> int:
+        # move is stored +1 so that 0 means no best move
+        return (move + 1) | (depth << 8) | (flag << 16) | (generation << 24)
+
+    def _read(self, bucket: int, slot: int, key: int):
+        '''Return (depth, flag, score, move, generation) if slot holds key, else None'''
+        words = self._words[bucket, slot]
+        check, score_bits, info = int(words[0]), int(words[1]), int(words[2])
+        if info == 0 or check ^ score_bits ^ info != key:
+            return None
+        return ((info >> 8) & 0xFF, (info >> 16) & 0xFF, float(self._scores[bucket, slot, 1]),
+                (info & 0xFF) - 1, (info >> 24) & 0xFF)
+
+    def probe(self, key: int):
+        '''Return (depth, flag, score, move) stored for key, or None on a miss'''
+        self.probes += 1
+        bucket = key & self._mask
+        for slot in range(SLOTS):
+            entry = self._read(bucket, slot, key)
+            if entry is not None:
+                self.hits += 1
+                return entry[:4]
+        return None
+
+    def _choose_slot(self, bucket: int, key: int, depth: int):
+        '''Pick the slot to overwrite under the replacement scheme, or None to drop the result'''
+        depths = []
+        for slot in range(SLOTS):
+            info = int(self._words[bucket, slot, 2])
+            entry = self._read(bucket, slot, key)
+            if entry is not None: # same position: always refresh it
+                return slot
+            stale = info == 0 or ((info >> 24) & 0xFF) != self.generation
+            depths.append(-1 if stale else (info >> 8) & 0xFF)
+
+        if self.replacement == 'always':
+            return (key >> 63) & 1
+        if self.replacement == 'depth':
+            slot = 0 if depths[0] <= depths[1] else 1
+            return slot if depth >= depths[slot] else None
+        # depth+always: deep results go to the first slot, everything else to the second
+        return 0 if depth >= depths[0] else 1
+
+    def store(self, key: int, depth: int, flag: int, score: float, move: int = -1) -> None:
+        '''Store a search result; move is a bit index (row * 8 + col) or -1'''
+        bucket = key & self._mask
+        slot = self._choose_slot(bucket, key, depth)
+        if slot is None:
+            return
+        info = self._pack(depth, flag, move, self.generation)
+        self._scores[bucket, slot, 1] = score
+        score_bits = int(self._words[bucket, slot, 1])
+        self._words[bucket, slot, 2] = info
+        self._words[bucket, slot, 0] = key ^ score_bits ^ info
+        self.stores += 1
+
+class SharedTranspositionTable(TranspositionTable):
+    '''TranspositionTable whose entries live in multiprocessing shared memory.
+
+    The creating process owns the segment. Other processes attach with
+    SharedTranspositionTable(size_mb, name=table.name). Stores need no lock:
+    a reader that sees a half-written entry fails the check word and treats
+    it as a miss.
+    '''
+
+    def __init__(self, size_mb: float = DEFAULT_SIZE_MB, replacement: str = 'depth+always', name: str = None) -> None:
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=TranspositionTable.bytes_needed(size_mb))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        super().__init__(size_mb, replacement, buffer=self.shm.buf)
+
+    def close(self) -> None:
+        '''Detach from the segment, and free it if this process created it'''
+        # the numpy views must go before the buffer they point into is closed
+        del self._words, self._scores
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()